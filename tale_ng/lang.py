@@ -6,8 +6,11 @@ Copyright by Irmen de Jong (irmen@razorvine.net)
 """
 
 import collections
+import functools
 import re
-from typing import List, Iterable
+from enum import Enum
+from typing import Any, Callable, List, Iterable, Mapping, NamedTuple, Optional, Set, Tuple, Union
+from .numberwords import spell_number, spell_ordinal, ordinal, NUMBER_WORDS, TENS_WORDS, NUMBER_ORDINALS, TENS_ORDINALS  # noqa: F401
 
 # genders are m,f,n
 SUBJECTIVE = {"m": "he", "f": "she", "n": "it"}
@@ -16,39 +19,48 @@ OBJECTIVE = {"m": "him", "f": "her", "n": "it"}
 GENDERS = {"m": "male", "f": "female", "n": "neuter"}
 
 
-def join(words: Iterable[str], conj: str = "and", group_multi: bool = True) -> str:
+def join(words: Iterable[str], conj: str = "and", group_multi: bool = True, limit: int = 0) -> str:
     """
     Join a list of words to 'a,b,c, and e'
     If a word occurs multiple times (and group_multi=True),
     show 'thing and thing' as 'two things' instead.
+    If a limit is given, at most that many (grouped) words are shown, followed by 'N more'.
     """
+    if group_multi:
+        return join_counted(collections.Counter(words), conj, limit)
+    return join_counted(((word, 1) for word in words), conj, limit)
 
-    def apply_amount(count, word):
-        prefix, _, rest = word.partition(' ')
-        if rest and prefix in {"the", "a", "an"}:
-            # remove the article when we're dealing with multiple occurrences
-            word = rest
-        return spell_number(count) + " " + pluralize(word)
 
-    if not words:
-        return ""
-    words = list(words)
-    if len(words) == 1:
-        return words[0]
-    if group_multi and len(set(words)) == 1:
-        return apply_amount(len(words), words[0])  # all words are the same
-    if len(words) == 2:
-        return "%s %s %s" % (words[0], conj, words[1])
-    if group_multi:
-        counts = collections.Counter(words)
-        words = []
-        for word, count in counts.items():
-            if count == 1:
-                words.append(word)
-            else:
-                words.append(apply_amount(count, word))
-        return join(words, conj, group_multi=False)
-    return "%s, %s %s" % (", ".join(words[:-1]), conj, words[-1])
+def join_counted(counts: Union[Mapping[str, int], Iterable[Tuple[str, int]]], conj: str = "and", limit: int = 0) -> str:
+    """
+    Join words that are already counted, such as a Counter or (word, count) pairs, in a single pass.
+    A word with a count of more than one is shown as 'two things' (without its article), words with a count of zero are skipped.
+    If a limit is given, at most that many words are shown, the others are summed up as 'N more'.
+    """
+    if isinstance(counts, Mapping):
+        counts = counts.items()
+    shown: List[str] = []
+    more = 0
+    for word, count in counts:
+        if count <= 0:
+            continue
+        if limit and len(shown) >= limit:
+            more += count
+        elif count == 1:
+            shown.append(word)
+        else:
+            prefix, _, rest = word.partition(' ')
+            if rest and prefix in {"the", "a", "an"}:
+                # remove the article when we're dealing with multiple occurrences
+                word = rest
+            shown.append(spell_number(count) + " " + _plural(word))
+    if more:
+        shown.append(spell_number(more) + " more")
+    if len(shown) > 2:
+        return "%s, %s %s" % (", ".join(shown[:-1]), conj, shown[-1])
+    if len(shown) == 2:
+        return "%s %s %s" % (shown[0], conj, shown[1])
+    return shown[0] if shown else ""
 
 
 def fullstop(sentence: str, punct: str = ".") -> str:
@@ -88,110 +100,68 @@ def fullverb(verb: str) -> str:
     return verb + "ing"
 
 
-def split(string: str) -> List[str]:
-    """
-    Split a string on whitespace, but keeps words enclosed in quotes (' or ") together.
-    The quotes themselves are stripped out.
-    """
-
-    def removequotes(word):
-        if word.startswith(('"', "'")) and word.endswith(('"', "'")):
-            return word[1:-1].strip()
-        return word
+class TokenType(Enum):
+    WORD = 1    # a sequence of non-whitespace characters
+    QUOTED = 2  # text enclosed in quotes (' or "), the quotes are not part of the token's text
+    PUNCT = 3   # a word that consists only of punctuation, such as a lone comma
 
-    return [removequotes(p) for p in re.split("( |\\\".*?\\\"|'.*?')", string) if p.strip()]
 
+class Token(NamedTuple):
+    type: TokenType
+    text: str
+    start: int  # offset of the token in the source string (for quoted text: of the opening quote)
+    end: int    # offset just after the token in the source string
 
-__number_words = [
-    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
-    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty"
-]
 
-__tens_words = [
-    "", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"
-]
+_word_regex = re.compile(r"(?=\S*[^\W_])(\S+)|(\S+)")    # group 1: word with letters or digits, group 2: punctuation
+_token_types = {1: TokenType.WORD, 2: TokenType.PUNCT}     # regex group number -> token type
+_nonspace_regex = re.compile(r"\S")
+_run_regex = re.compile(r"\S+")
+_letter_regex = re.compile(r"[^\W_]")
 
-__number_ordinals = [
-    "zeroth", "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
-    "eleventh", "twelfth", "thirteenth", "fourteenth", "fifteenth", "sixteenth", "seventeenth", "eighteenth",
-    "nineteenth", "twentieth"
-]
 
-__tens_ordinals = [
-    "", "tenth", "twentieth", "thirtieth", "fortieth", "fiftieth", "sixtieth", "seventieth", "eightieth", "ninetieth"
-]
+def tokenize(string: str) -> List[Token]:
+    """
+    Split a string into word, quoted text and punctuation tokens, in a single pass.
+    A quote only starts a quoted text at the beginning of a word, and the quoted text ends at the
+    first matching quote that is followed by whitespace, punctuation or the end of the string.
+    (so "don't" is a normal word and 'don't do that' is a single quoted text)
+    A quote that isn't closed is just part of the word it is in.
+    """
+    if "'" not in string and '"' not in string:
+        # fast path without quoted text
+        return [Token(_token_types[m.lastindex or 1], m.group(), *m.span()) for m in _word_regex.finditer(string)]
+    tokens: List[Token] = []
+    length = len(string)
+    no_close = {"'": length, '"': length}   # quote character -> position from where there's no closing quote anymore
+    pos = 0
+    while True:
+        match = _nonspace_regex.search(string, pos)
+        if not match:
+            return tokens
+        start = match.start()
+        char = string[start]
+        if char in no_close and start + 1 < no_close[char]:
+            close = string.find(char, start + 1)
+            while close >= 0 and close + 1 < length and string[close + 1].isalnum():
+                close = string.find(char, close + 1)
+            if close >= 0:
+                tokens.append(Token(TokenType.QUOTED, string[start + 1:close].strip(), start, close + 1))
+                pos = close + 1
+                continue
+            no_close[char] = start + 1
+        # the rest of the word is scanned only once: it is consumed by this token
+        pos = _run_regex.match(string, start).end()     # type: ignore
+        token_type = TokenType.WORD if _letter_regex.search(string, start, pos) else TokenType.PUNCT
+        tokens.append(Token(token_type, string[start:pos], start, pos))
 
 
-def spell_number(number: float) -> str:
+def split(string: str) -> List[str]:
     """
-    Return a spelling of the number. Supports positive and negative ints,
-    floats, and recognises popular fractions such as 0.5 and 0.25.
-    Numbers that are very near a whole number are also returned as "about N".
-    Any fraction that can not be spelled out (or is larger than +/- 100) will
-    not be spelled out in words, but returned in numerical form.
+    Split a string on whitespace, but keeps words enclosed in quotes (' or ") together.
+    The quotes themselves are stripped out.
     """
-
-    def spell_positive_int(n):
-        if n <= 20:
-            return __number_words[n]
-        tens, ones = divmod(n, 10)
-        if tens <= 9:
-            if ones > 0:
-                return __tens_words[tens] + "-" + __number_words[ones]
-            return __tens_words[tens]
-        return str(n)
-
-    sign = ""
-    orig_number = number
-    if number < 0:
-        sign = "minus "
-        number = -number
-    whole, fraction = divmod(number, 1)
-    whole = int(whole)
-    if fraction == 0.0:
-        return sign + spell_positive_int(whole)
-    elif fraction == 0.5:
-        return sign + spell_positive_int(whole) + " and a half"
-    elif fraction == 0.25:
-        return sign + spell_positive_int(whole) + " and a quarter"
-    elif fraction == 0.75:
-        return sign + spell_positive_int(whole) + " and three quarters"
-    elif fraction > 0.995:
-        return "about " + sign + spell_positive_int(whole + 1)
-    elif fraction < 0.005:
-        return "about " + sign + spell_positive_int(whole)
-    return str(orig_number)  # can't spell other fractions
-
-
-def spell_ordinal(number: int) -> str:
-    """Return a spelling of the ordinal number. Supports positive and negative ints."""
-    number = int(number)
-    n = abs(number)
-    sign = "" if number >= 0 else "minus "
-    if n <= 20:
-        return sign + __number_ordinals[n]
-    tens, ones = divmod(n, 10)
-    if tens <= 9:
-        if ones > 0:
-            return sign + __tens_words[tens] + "-" + __number_ordinals[ones]
-        return __tens_ordinals[tens]
-    return ordinal(n)
-
-
-def ordinal(number: int) -> str:
-    """return the simple ordinal (1st, 3rd, 8th etc) of a number. Supports positive and negative ints."""
-    suf = "th"
-    number = int(number)
-    anum = abs(number)
-    if (anum % 100) // 10 != 1:
-        n = anum % 10
-        if n == 1:
-            suf = "st"
-        elif n == 2:
-            suf = "nd"
-        elif n == 3:
-            suf = "rd"
-    return "%d%s" % (number, suf)
+    return [token.text for token in tokenize(string)]
 
 
 # words that cannot be prefixed with 'a' or 'an'
@@ -201,73 +171,84 @@ no_a_words = {
                  "everyone", "everybody", "everywhere", "everything",
                  "someone", "somebody", "somewhere", "something",
                  "anyone", "anybody", "anywhere", "anything",
-             } | set(__number_words) | set(__tens_words)
+             } | set(NUMBER_WORDS) | set(TENS_WORDS)
 
 
-def a(noun_phrase: str) -> str:
-    """prefix an article 'a' or 'an' (if possible)"""
-    w = noun_phrase.partition(" ")[0].lower()
+# precompiled patterns of the article algorithm, adapted from CPAN package Lingua-EN-Inflect by Damian Conway
+_article_word_regex = re.compile(r"\w+")
+_an_abbreviation_regex = re.compile(r'(?!FJO|[HLMNS]Y.|RY[EO]|SQU|'
+                                    r'(F[LR]?|[HL]|MN?|N|RH?|S[CHKLMNPTVW]?|X(YL)?)[AEIOU])'
+                                    r'[FHLMNRSX][A-Z]')
+_a_sound_regex = re.compile(r'e[uw]|onc?e\b|uni([^nmd]|mo)|u[bcfhjkqrst][aeiou]')
+_a_uk_regex = re.compile(r'U[NK][AIEO]')  # original regex was /^U[NK][AIEO]?/ but that matches UK, UN, etc.
+_an_y_regex = re.compile(r'y(b[lor]|cl[ea]|fere|gg|p[ios]|rou|tt)')
+ARTICLE_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=ARTICLE_CACHE_SIZE)
+def _article(leading: str) -> str:
+    """
+    The article for a noun phrase: 'a ', 'an ', 'the ' or '' (no article possible).
+    Only the leading part of the phrase matters: its first word, or the whole phrase if that word has no letters.
+    """
+    w = leading.partition(" ")[0].lower()
     if w in no_a_words or w.endswith("'s"):
-        return noun_phrase
-    if w in __number_ordinals or w in __tens_ordinals:
-        return "the " + noun_phrase
-    # algorithm adapted from CPAN package Lingua-EN-Inflect by Damian Conway
-    if not noun_phrase:
         return ""
-    if noun_phrase.lower() in {"a", "an"}:
-        return "an " + noun_phrase
-    m = re.search(r"\w+", noun_phrase)
-    if m:
-        word = m.group(0)
-        if word.lower() in {"a", "an"}:
-            return noun_phrase
-    else:
-        return 'an ' + noun_phrase
-
+    if w in NUMBER_ORDINALS or w in TENS_ORDINALS:
+        return "the "
+    m = _article_word_regex.search(leading)
+    if not m:
+        return "an "
+    word = m.group(0)
     wordi = word.lower()
+    if wordi in {"a", "an"}:
+        return ""
     if wordi.startswith(('euler', 'heir', 'honest', 'hono')):
-        return 'an ' + noun_phrase
-
+        return "an "
     if wordi.startswith('hour') and not wordi.startswith('houri'):
-        return 'an ' + noun_phrase
-
+        return "an "
     if len(word) == 1:
-        if wordi in 'aefhilmnorsx':
-            return 'an ' + noun_phrase
-        else:
-            return 'a ' + noun_phrase
-
-    if re.match(r'(?!FJO|[HLMNS]Y.|RY[EO]|SQU|'
-                r'(F[LR]?|[HL]|MN?|N|RH?|S[CHKLMNPTVW]?|X(YL)?)[AEIOU])'
-                r'[FHLMNRSX][A-Z]', word):
-        return 'an ' + noun_phrase
-
-    for regex in (r'^e[uw]', r'^onc?e\b',
-                  r'^uni([^nmd]|mo)', '^u[bcfhjkqrst][aeiou]'):
-        if re.match(regex, wordi):
-            return 'a ' + noun_phrase
-
-    # original regex was /^U[NK][AIEO]?/ but that matches UK, UN, etc.
-    if re.match('^U[NK][AIEO]', word):
-        return 'a ' + noun_phrase
-    elif word == word.upper():
-        if wordi[0] in 'aefhilmnorsx':
-            return 'an ' + noun_phrase
-        else:
-            return 'a ' + noun_phrase
-
+        return "an " if wordi in 'aefhilmnorsx' else "a "
+    if _an_abbreviation_regex.match(word):
+        return "an "
+    if _a_sound_regex.match(wordi) or _a_uk_regex.match(word):
+        return "a "
+    if word == word.upper():
+        return "an " if wordi[0] in 'aefhilmnorsx' else "a "
     if wordi[0] in 'aeiou':
-        return 'an ' + noun_phrase
+        return "an "
+    if _an_y_regex.match(wordi):
+        return "an "
+    return "a "
 
-    if re.match(r'^y(b[lor]|cl[ea]|fere|gg|p[ios]|rou|tt)', wordi):
-        return 'an ' + noun_phrase
-    else:
-        return 'a ' + noun_phrase
+
+def _leading(noun_phrase: str) -> str:
+    """the part of the noun phrase that determines its article (the key of the article cache)"""
+    first_word = noun_phrase.partition(" ")[0]
+    if first_word[:1].isalnum() or _article_word_regex.search(first_word):
+        return first_word
+    return noun_phrase
+
+
+def a(noun_phrase: str) -> str:
+    """prefix an article 'a' or 'an' (if possible)"""
+    return _article(_leading(noun_phrase)) + noun_phrase
 
 
 def A(word: str) -> str:
     """prefix an article 'A' or 'An' capitalized. (if possible)"""
-    return capital(a(word))
+    article = _article(_leading(word))
+    if article:
+        return article.capitalize() + word
+    return capital(word)
+
+
+def a_many(noun_phrases: Iterable[str], capitalized: bool = False) -> List[str]:
+    """prefix articles to all the noun phrases at once (like a, or like A if capitalized)"""
+    if capitalized:
+        return [A(noun_phrase) for noun_phrase in noun_phrases]
+    article, leading = _article, _leading
+    return [article(leading(noun_phrase)) + noun_phrase for noun_phrase in noun_phrases]
 
 
 __plural_irregularities = {
@@ -297,16 +278,18 @@ __plural_irregularities = {
 }
 
 
-def pluralize(word: str, amount: float = 2) -> str:
-    if amount == 1:
-        return word
+PLURAL_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=PLURAL_CACHE_SIZE)
+def _plural(word: str) -> str:
     if word in __plural_irregularities:
         return __plural_irregularities[word]
     if word.endswith("is"):
         return word[:-2] + "es"
     if word.endswith("z"):
         return word + "zes"
-    if word.endswith("s") or word.endswith("ch") or word.endswith("x") or word.endswith("sh"):
+    if word.endswith(("s", "ch", "x", "sh")):
         return word + "es"
     if word.endswith("y"):
         if len(word) > 1 and word[-2] in "aeiou":
@@ -321,6 +304,46 @@ def pluralize(word: str, amount: float = 2) -> str:
     return word + "s"
 
 
+def pluralize(word: str, amount: float = 2) -> str:
+    if amount == 1:
+        return word
+    return _plural(word)
+
+
+def pluralize_many(words: Iterable[str], amount: float = 2) -> List[str]:
+    """pluralize all the words at once"""
+    if amount == 1:
+        return list(words)
+    plural = _plural
+    return [plural(word) for word in words]
+
+
+def add_plurals(irregulars: Mapping[str, str]) -> None:
+    """Add irregular plurals (singular -> plural) to the lexicon, replacing the ones that were already in it."""
+    __plural_irregularities.update(irregulars)
+    _plural.cache_clear()
+
+
+def load_plurals(path: str) -> int:
+    """
+    Load irregular plurals from a utf-8 text file with a singular and its plural on every line,
+    separated by a tab (then they can contain spaces) or else by whitespace. Empty lines and lines starting with # are skipped.
+    Returns the number of plurals that were loaded.
+    """
+    irregulars = {}
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            pair = line.split("\t") if "\t" in line else line.split()
+            if len(pair) != 2:
+                raise ValueError("%s line %d: expected a singular and a plural" % (path, number))
+            irregulars[pair[0].strip()] = pair[1].strip()
+    add_plurals(irregulars)
+    return len(irregulars)
+
+
 def yesno(value: str) -> bool:
     value = value.lower() if value else ""
     if value in {"y", "yes", "sure", "yep", "yeah", "yessir", "sure thing"}:
@@ -350,3 +373,153 @@ def validate_gender_mf(value: str) -> str:
         if value[0] in genders and genders[value[0]] == value:
             return value
     raise ValueError("That is not a valid gender.")
+
+
+_template_field_regex = re.compile(r"\{\{|\}\}|\{(\w+)(?:\.(\w+))?(?::(\w+))?\}")
+_verb_forms = {"be": ("are", "is"), "have": ("have", "has")}    # verb -> (form for 'you', form for he/she/it)
+TEMPLATE_CACHE_SIZE = 4096
+
+
+def third_person(verb: str) -> str:
+    """the form of the verb for he/she/it: smile->smiles, kiss->kisses, cry->cries"""
+    if verb in _verb_forms:
+        return _verb_forms[verb][1]
+    if verb.endswith(("s", "sh", "ch", "x", "z", "o")):
+        return verb + "es"
+    if verb.endswith("y") and len(verb) > 1 and verb[-2] not in "aeiou":
+        return verb[:-1] + "ies"
+    return verb + "s"
+
+
+def _subj(who: Any, observer: Any, reflexive: bool) -> str:
+    return "you" if who is observer else who.subjective
+
+
+def _obj(who: Any, observer: Any, reflexive: bool) -> str:
+    if reflexive:
+        return "yourself" if who is observer else who.objective + "self"
+    return "you" if who is observer else who.objective
+
+
+def _poss(who: Any, observer: Any, reflexive: bool) -> str:
+    possessive = "your" if who is observer else who.possessive
+    return possessive + " own" if reflexive else possessive
+
+
+def _title(who: Any, observer: Any, reflexive: bool) -> str:
+    if reflexive:
+        return _obj(who, observer, reflexive)
+    return "you" if who is observer else who.title
+
+
+def _poss_title(who: Any, observer: Any, reflexive: bool) -> str:
+    if reflexive:
+        return _poss(who, observer, reflexive)
+    return "your" if who is observer else possessive(who.title)
+
+
+_template_words = {"subj": _subj, "obj": _obj, "poss": _poss, "title": _title, "poss_title": _poss_title}
+
+
+class MessageTemplate:
+    """
+    A message text with fields, that is parsed once and can then be rendered for every observer.
+    The fields are the names of the values that are given when rendering:
+    {name} is the value itself (an object gives its title, see below), {name.word} is an observer aware word for the object,
+    where the word is subj (he/you), obj (him/you), poss (his/your), title (Max/you) or poss_title (Max's/your).
+    The words of other objects than the actor are reflexive when that object is the actor (himself, his own).
+    {name:s} is a verb in the form that goes with the actor (you smile, Max smiles).
+    A field name with a capital letter is capitalized in the message ({Actor.subj}), {{ and }} are literal braces.
+    Example: MessageTemplate("{Actor.subj} {verb:s} {target.poss} foot.").render(observer, actor=max, target=kate, verb="kick")
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.names: Set[str] = set()
+        self._parts: List[Union[str, Callable[[Any, Mapping[str, Any]], str]]] = []
+        literal: List[str] = []
+        position = 0
+        for match in _template_field_regex.finditer(text):
+            literal.append(text[position:match.start()])
+            position = match.end()
+            if match.group(1) is None:
+                literal.append(match.group()[0])    # escaped brace
+                continue
+            if "".join(literal):
+                self._parts.append("".join(literal))
+            literal = []
+            self._parts.append(self._compile_field(*match.groups()))
+        literal.append(text[position:])
+        if "".join(literal):
+            self._parts.append("".join(literal))
+
+    def _compile_field(self, name: str, word: Optional[str], spec: Optional[str]) -> Callable[[Any, Mapping[str, Any]], str]:
+        capitalized = name[0].isupper()
+        name = name.lower()
+        self.names.add(name)
+        if spec is not None:
+            if spec != "s" or word:
+                raise ValueError("invalid template field {%s%s:%s} in %r" % (name, "." + word if word else "", spec, self.text))
+
+            def render_field(observer: Any, values: Mapping[str, Any]) -> str:
+                verb = values[name]
+                if "actor" in values and values["actor"] is observer:
+                    verb = _verb_forms[verb][0] if verb in _verb_forms else verb
+                else:
+                    verb = third_person(verb)
+                return capital(verb) if capitalized else verb
+        elif word:
+            if word not in _template_words:
+                raise ValueError("invalid template field {%s.%s} in %r" % (name, word, self.text))
+            replacement = _template_words[word]
+            is_actor = name == "actor"
+
+            def render_field(observer: Any, values: Mapping[str, Any]) -> str:
+                who = values[name]
+                text = replacement(who, observer, not is_actor and who is values.get("actor"))
+                return capital(text) if capitalized else text
+        else:
+            is_actor = name == "actor"
+
+            def render_field(observer: Any, values: Mapping[str, Any]) -> str:
+                value = values[name]
+                if isinstance(value, str):
+                    text = value
+                elif hasattr(value, "title"):
+                    text = _title(value, observer, not is_actor and value is values.get("actor"))
+                else:
+                    text = str(value)
+                return capital(text) if capitalized else text
+        return render_field
+
+    def render(self, observer: Any = None, **values: Any) -> str:
+        """the message as the observer sees it (None: someone who is not one of the values)"""
+        return "".join([part if isinstance(part, str) else part(observer, values) for part in self._parts])
+
+    def render_many(self, observers: Iterable[Any], **values: Any) -> List[str]:
+        """
+        The message for every observer. It is rendered only once for all the observers
+        that are not one of the values (the bystanders).
+        """
+        involved = {id(value) for value in values.values()}
+        bystanders_message = None
+        messages = []
+        for observer in observers:
+            if id(observer) in involved:
+                messages.append(self.render(observer, **values))
+            else:
+                if bystanders_message is None:
+                    bystanders_message = self.render(None, **values)
+                messages.append(bystanders_message)
+        return messages
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def message_template(text: str) -> MessageTemplate:
+    """the compiled template of the message text (compiled only once)"""
+    return MessageTemplate(text)
+
+
+def render_message(text: str, observer: Any = None, **values: Any) -> str:
+    """renders the message text for the observer, see MessageTemplate"""
+    return message_template(text).render(observer, **values)
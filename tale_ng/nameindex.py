@@ -0,0 +1,296 @@
+"""
+Indexes of mud objects by their name and aliases.
+These are kept up to date incrementally by the containers that own them,
+so that lookups by name don't require scanning (or rebuilding a dict of) all objects.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import bisect
+import heapq
+from typing import Any, Dict, List, Tuple, Iterator, Iterable, Optional, MutableSet, Mapping, MutableMapping, Sequence
+
+
+class WordTrie:
+    """
+    Trie of names on a word level ("rusty iron key" -> rusty -> iron -> key),
+    used to find the longest name in a sequence of words in a single pass.
+    """
+    __slots__ = ("_root",)
+
+    _END = " "   # key that marks the end of a name in a node (cannot be a word, words contain no whitespace)
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self._root: Dict[str, Any] = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> None:
+        node = self._root
+        for word in name.split():
+            node = node.setdefault(word, {})
+        node[self._END] = name
+
+    def remove(self, name: str) -> None:
+        path = []
+        node = self._root
+        for word in name.split():
+            path.append((node, word))
+            child: Optional[Dict[str, Any]] = node.get(word)
+            if child is None:
+                return
+            node = child
+        node.pop(self._END, None)
+        # prune the nodes that have become empty
+        for parent, word in reversed(path):
+            if parent[word]:
+                break
+            del parent[word]
+
+    def clear(self) -> None:
+        self._root.clear()
+
+    def match(self, words: Sequence[str], start: int) -> Tuple[str, int]:
+        """
+        Finds the longest name that occurs in the words, starting at the given index.
+        Returns (name, number of words used) or ("", 0) if there's no match.
+        """
+        node = self._root
+        found = ("", 0)
+        for index in range(start, len(words)):
+            child: Optional[Dict[str, Any]] = node.get(words[index])
+            if child is None:
+                break
+            node = child
+            if self._END in node:
+                found = (node[self._END], index - start + 1)
+        return found
+
+
+class NameIndex(Mapping[str, Any]):
+    """
+    Read-only mapping of name (and alias) -> object.
+    If multiple objects share the same name, the one that was added first is returned.
+    The version number is increased on every change.
+    """
+
+    def __init__(self) -> None:
+        self._index: Dict[str, List[Any]] = {}
+        self._names: Dict[Any, Tuple[str, ...]] = {}    # the names under which each object is indexed
+        self._sorted_names: Optional[List[str]] = None   # for prefix searches, built on first use and then kept up to date
+        self.trie = WordTrie()
+        self.version = 0
+
+    # indexes are compared by identity, not by their contents
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __getitem__(self, name: str) -> Any:
+        return self._index[name][0]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        objects = self._index.get(name)
+        return objects[0] if objects else default
+
+    def add(self, obj: Any) -> None:
+        """Index the object under its name and aliases."""
+        if obj in self._names:
+            return
+        names = (obj.name,) + tuple(obj.aliases)
+        self._names[obj] = names
+        for name in names:
+            if name in self._index:
+                self._index[name].append(obj)
+            else:
+                self._index[name] = [obj]
+                self.trie.add(name)
+                if self._sorted_names is not None:
+                    bisect.insort(self._sorted_names, name)
+        obj._name_indexes.add(self)
+        self.version += 1
+
+    def discard(self, obj: Any) -> None:
+        """Remove the object from the index (it's okay if it isn't in it)."""
+        names = self._names.pop(obj, None)
+        if names is None:
+            return
+        for name in names:
+            objects = self._index[name]
+            objects.remove(obj)
+            if not objects:
+                del self._index[name]
+                self.trie.remove(name)
+                if self._sorted_names is not None:
+                    del self._sorted_names[bisect.bisect_left(self._sorted_names, name)]
+        obj._name_indexes.discard(self)
+        self.version += 1
+
+    def contains_object(self, obj: Any) -> bool:
+        """is the object in the index (under any name)?"""
+        return obj in self._names
+
+    def update(self, obj: Any) -> None:
+        """Re-index the object because its name or aliases have changed."""
+        self.discard(obj)
+        self.add(obj)
+
+    def clear(self) -> None:
+        for obj in self._names:
+            obj._name_indexes.discard(self)
+        self._index.clear()
+        self._names.clear()
+        self._sorted_names = None
+        self.trie.clear()
+        self.version += 1
+
+    def match(self, words: Sequence[str], start: int) -> Tuple[Any, str, int]:
+        """
+        Finds the longest name in the words starting at the given index.
+        Returns (object, name, number of words used) or (None, "", 0) if there's no match.
+        """
+        name, wordcount = self.trie.match(words, start)
+        if wordcount:
+            return self._index[name][0], name, wordcount
+        return None, "", 0
+
+    def search_prefix(self, prefix: str, amount: int = 0) -> List[str]:
+        """
+        Returns the names that start with the prefix, the shortest (closest) completions first and
+        then alphabetically, up to the given amount (0 = all of them). The names are found with a binary search.
+        """
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self._index)
+        names = self._sorted_names
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + "\U0010ffff", start)
+        if amount:
+            return heapq.nsmallest(amount, names[start:end], key=len)
+        return sorted(names[start:end], key=len)
+
+
+class NameMap(MutableMapping[str, Any]):
+    """
+    Mapping of name -> object (such as direction -> exit) that keeps a word trie
+    of its keys to find (multi-word) names in a sequence of words.
+    The version number is increased on every change.
+    """
+
+    def __init__(self) -> None:
+        self._map: Dict[str, Any] = {}
+        self.trie = WordTrie()
+        self.version = 0
+
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __getitem__(self, name: str) -> Any:
+        return self._map[name]
+
+    def __setitem__(self, name: str, obj: Any) -> None:
+        if name not in self._map:
+            self.trie.add(name)
+        self._map[name] = obj
+        self.version += 1
+
+    def __delitem__(self, name: str) -> None:
+        del self._map[name]
+        self.trie.remove(name)
+        self.version += 1
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._map
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._map)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __repr__(self) -> str:
+        return "<NameMap %r>" % self._map
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self._map.get(name, default)
+
+    def match(self, words: Sequence[str], start: int) -> Tuple[Any, str, int]:
+        """
+        Finds the longest name in the words starting at the given index.
+        Returns (object, name, number of words used) or (None, "", 0) if there's no match.
+        """
+        name, wordcount = self.trie.match(words, start)
+        if wordcount:
+            return self._map[name], name, wordcount
+        return None, "", 0
+
+
+def match_longest(indexes: Iterable[Any], words: Sequence[str], start: int) -> Tuple[Any, str, int]:
+    """
+    Finds the longest name in the words starting at the given index, in all of the given
+    indexes (NameIndex or NameMap). If multiple indexes match equally long names,
+    the first index wins. Returns (object, name, number of words used) or (None, "", 0).
+    """
+    result = (None, "", 0)
+    for index in indexes:
+        match = index.match(words, start)
+        if match[2] > result[2]:
+            result = match
+    return result
+
+
+def search_prefix(indexes: Iterable[NameIndex], prefix: str, amount: int = 0) -> List[str]:
+    """Like NameIndex.search_prefix, but for the names in all of the given indexes together."""
+    names = set()
+    for index in indexes:
+        names.update(index.search_prefix(prefix, amount))
+    ranked = sorted(names, key=lambda name: (len(name), name))
+    return ranked[:amount] if amount else ranked
+
+
+class IndexedSet(MutableSet[Any]):
+    """A set of mud objects that keeps a NameIndex of its contents up to date."""
+
+    def __init__(self, objects: Optional[Iterable[Any]] = None) -> None:
+        self._objects: MutableSet[Any] = set()
+        self.index = NameIndex()
+        if objects:
+            self.update(objects)
+
+    def __contains__(self, obj: object) -> bool:
+        return obj in self._objects
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._objects)
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __repr__(self) -> str:
+        return "<IndexedSet %r>" % self._objects
+
+    def add(self, obj: Any) -> None:
+        if obj not in self._objects:
+            self._objects.add(obj)
+            self.index.add(obj)
+
+    def discard(self, obj: Any) -> None:
+        if obj in self._objects:
+            self._objects.remove(obj)
+            self.index.discard(obj)
+
+    def update(self, objects: Iterable[Any]) -> None:
+        for obj in objects:
+            self.add(obj)
+
+    def clear(self) -> None:
+        self._objects.clear()
+        self.index.clear()
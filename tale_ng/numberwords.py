@@ -0,0 +1,168 @@
+"""
+Spelling of numbers and ordinals, table driven.
+
+The spellings of the whole numbers below PRECOMPUTED are computed once (on first use), larger numbers are spelled
+from the tables of their groups of three digits, and the spellings of fractions are cached.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import functools
+from typing import List
+
+NUMBER_WORDS = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty"
+]
+
+TENS_WORDS = [
+    "", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"
+]
+
+NUMBER_ORDINALS = [
+    "zeroth", "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+    "eleventh", "twelfth", "thirteenth", "fourteenth", "fifteenth", "sixteenth", "seventeenth", "eighteenth",
+    "nineteenth", "twentieth"
+]
+
+TENS_ORDINALS = [
+    "", "tenth", "twentieth", "thirtieth", "fortieth", "fiftieth", "sixtieth", "seventieth", "eightieth", "ninetieth"
+]
+
+SCALE_WORDS = ["", "thousand", "million", "billion", "trillion"]   # numbers from 1000 ** len(SCALE_WORDS) are not spelled out
+PRECOMPUTED = 10000     # the default number of precomputed spellings
+FRACTION_CACHE_SIZE = 1024
+
+_cardinals: List[str] = []     # spelling of every number below the precomputed size
+_ordinals: List[str] = []
+_below_thousand: List[str] = []
+_ordinal_suffixes = ["th", "st", "nd", "rd"] + ["th"] * 6 + ["th"] * 10 + (["th", "st", "nd", "rd"] + ["th"] * 6) * 8
+
+
+def _spell_below_thousand(n: int) -> str:
+    hundreds, rest = divmod(n, 100)
+    if rest <= 20:
+        spelled = NUMBER_WORDS[rest]
+    else:
+        tens, ones = divmod(rest, 10)
+        spelled = TENS_WORDS[tens] + "-" + NUMBER_WORDS[ones] if ones else TENS_WORDS[tens]
+    if not hundreds:
+        return spelled
+    if rest:
+        return NUMBER_WORDS[hundreds] + " hundred and " + spelled
+    return NUMBER_WORDS[hundreds] + " hundred"
+
+
+def _spell_int(n: int) -> str:
+    """spelling of a positive int (that is not too large)"""
+    if n < 1000:
+        return _below_thousand[n]
+    groups = []
+    scale = 0
+    last = 0
+    while n:
+        n, group = divmod(n, 1000)
+        if group:
+            groups.append(_below_thousand[group] + " " + SCALE_WORDS[scale] if scale else _below_thousand[group])
+        if not scale:
+            last = group
+        scale += 1
+    if 0 < last < 100:
+        # one thousand and five
+        return " ".join(reversed(groups[1:])) + " and " + groups[0]
+    return " ".join(reversed(groups))
+
+
+def _to_ordinal(spelled: str) -> str:
+    """changes the last word of a spelled number into its ordinal"""
+    split = max(spelled.rfind(" "), spelled.rfind("-")) + 1
+    last = spelled[split:]
+    if last in NUMBER_WORDS:
+        return spelled[:split] + NUMBER_ORDINALS[NUMBER_WORDS.index(last)]
+    if last.endswith("y"):
+        return spelled[:-1] + "ieth"
+    return spelled + "th"
+
+
+def precompute(size: int = PRECOMPUTED) -> None:
+    """(Re)builds the tables with the spellings of the numbers below the given size."""
+    if not _below_thousand:
+        _below_thousand.extend(_spell_below_thousand(n) for n in range(1000))
+    cardinals = [_spell_int(n) for n in range(size)]
+    _ordinals[:] = [_to_ordinal(spelled) for spelled in cardinals]
+    _cardinals[:] = cardinals
+
+
+def spell_number(number: float) -> str:
+    """
+    Return a spelling of the number. Supports positive and negative ints,
+    floats, and recognises popular fractions such as 0.5 and 0.25.
+    Numbers that are very near a whole number are also returned as "about N".
+    Any fraction that can not be spelled out (or whole number that is too large) will
+    not be spelled out in words, but returned in numerical form.
+    """
+    if isinstance(number, int):
+        if 0 <= number < len(_cardinals):
+            return _cardinals[number]
+        if number < 0:
+            return "minus " + _spell_positive_int(-number)
+        return _spell_positive_int(number)
+    return _spell_fraction(number)
+
+
+def _spell_positive_int(n: int) -> str:
+    if not _below_thousand:
+        precompute()
+    if n < len(_cardinals):
+        return _cardinals[n]
+    if n < 1000 ** len(SCALE_WORDS):
+        return _spell_int(n)
+    return str(n)
+
+
+@functools.lru_cache(maxsize=FRACTION_CACHE_SIZE)
+def _spell_fraction(number: float) -> str:
+    sign = ""
+    orig_number = number
+    if number < 0:
+        sign = "minus "
+        number = -number
+    whole, fraction = divmod(number, 1)
+    whole = int(whole)
+    if fraction == 0.0:
+        return sign + _spell_positive_int(whole)
+    elif fraction == 0.5:
+        return sign + _spell_positive_int(whole) + " and a half"
+    elif fraction == 0.25:
+        return sign + _spell_positive_int(whole) + " and a quarter"
+    elif fraction == 0.75:
+        return sign + _spell_positive_int(whole) + " and three quarters"
+    elif fraction > 0.995:
+        return "about " + sign + _spell_positive_int(whole + 1)
+    elif fraction < 0.005:
+        return "about " + sign + _spell_positive_int(whole)
+    return str(orig_number)  # can't spell other fractions
+
+
+def spell_ordinal(number: int) -> str:
+    """Return a spelling of the ordinal number. Supports positive and negative ints."""
+    number = int(number)
+    if 0 <= number < len(_ordinals):
+        return _ordinals[number]
+    if not _below_thousand:
+        precompute()
+        return spell_ordinal(number)
+    n = abs(number)
+    sign = "" if number >= 0 else "minus "
+    if n < len(_ordinals):
+        return sign + _ordinals[n]
+    if n < 1000 ** len(SCALE_WORDS):
+        return sign + _to_ordinal(_spell_int(n))
+    return ordinal(number)
+
+
+def ordinal(number: int) -> str:
+    """return the simple ordinal (1st, 3rd, 8th etc) of a number. Supports positive and negative ints."""
+    number = int(number)
+    return "%d%s" % (number, _ordinal_suffixes[abs(number) % 100])
@@ -1,26 +1,88 @@
-from typing import Optional, AbstractSet, MutableSet, MutableMapping, FrozenSet, Union, Sequence
+from typing import Optional, AbstractSet, MutableSet, FrozenSet, Union, Sequence, Iterable, Mapping
 from . import lang
+from .nameindex import NameIndex, IndexedSet, NameMap
 
 # TODO migrate away from direct references and more towards an E/C system with id's as reference?
 
 
 class MudObject:
     def __init__(self, name: str, title: str = "", gender: str = "n", aliases: Optional[AbstractSet[str]] = None) -> None:
+        self._name_indexes: MutableSet[NameIndex] = set()     # the name indexes that contain this object
+        self._aliases: FrozenSet[str] = frozenset()
         self.name = name.lower()
         self.title = title or name
-        self.aliases = aliases or set()
+        self.aliases = aliases or frozenset()
         self.gender = gender
         self.subjective = lang.SUBJECTIVE[gender]
         self.possessive = lang.POSSESSIVE[gender]
         self.objective = lang.OBJECTIVE[gender]
 
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._name = name
+        for index in list(self._name_indexes):
+            index.update(self)
+
+    @property
+    def aliases(self) -> FrozenSet[str]:
+        # note: aliases can't be changed in-place, use add_alias or assign a new set of aliases instead.
+        return self._aliases
+
+    @aliases.setter
+    def aliases(self, aliases: Iterable[str]) -> None:
+        self._aliases = frozenset(aliases)
+        for index in list(self._name_indexes):
+            index.update(self)
+
+    def add_alias(self, alias: str) -> None:
+        """adds an alias (the name indexes that contain this object are updated)"""
+        if alias not in self._aliases:
+            self.aliases = self._aliases | {alias}
+
 
 class Location(MudObject):
     def __init__(self, name: str) -> None:
         super().__init__(name, )
-        self.exits: MutableMapping[str, MudObject] = {}
-        self.livings: MutableSet[Living] = set()
-        self.items: MutableSet[MudObject] = set()
+        self._exits = NameMap()    # direction -> exit
+        self._livings = IndexedSet()
+        self._items = IndexedSet()
+
+    @property
+    def exits(self) -> NameMap:
+        """the exits in this location, by direction"""
+        return self._exits
+
+    @exits.setter
+    def exits(self, exits: Mapping[str, 'Exit']) -> None:
+        exits = dict(exits)
+        self._exits.clear()
+        self._exits.update(exits)
+
+    @property
+    def livings(self) -> IndexedSet:
+        """the livings in this location. Use livings.index to look them up by name."""
+        return self._livings
+
+    @livings.setter
+    def livings(self, livings: Iterable['Living']) -> None:
+        livings = list(livings)
+        self._livings.clear()
+        self._livings.update(livings)
+
+    @property
+    def items(self) -> IndexedSet:
+        """the items in this location. Use items.index to look them up by name."""
+        return self._items
+
+    @items.setter
+    def items(self, items: Iterable[MudObject]) -> None:
+        items = list(items)
+        self._items.clear()
+        self._items.update(items)
 
 
 class Exit(MudObject):
@@ -57,12 +119,27 @@ class Living(MudObject):
     def __init__(self, name: str, gender: str, title: str = "", location: Location = limbo) -> None:
         super().__init__(name, title, gender)
         self.location = location
-        self.__inventory: MutableSet[MudObject] = set()
+        self.__inventory = IndexedSet()
 
     @property
     def inventory(self) -> FrozenSet[MudObject]:
         return frozenset(self.__inventory)
 
+    @property
+    def inventory_index(self) -> NameIndex:
+        """the items in the inventory by name (and aliases)"""
+        return self.__inventory.index
+
+    def insert(self, item: MudObject) -> None:
+        """Add an item to the inventory."""
+        self.__inventory.add(item)
+
+    def remove(self, item: MudObject) -> None:
+        """Remove an item from the inventory."""
+        if item not in self.__inventory:
+            raise KeyError(item)
+        self.__inventory.discard(item)
+
     def search_item(self, name: str,
                     include_inventory: bool = True,
                     include_location: bool = True,
@@ -70,8 +147,14 @@ class Living(MudObject):
         """
         If an item with the given name is found in the specified places, it is returned.
         Otherwise, None is returned.
+        There are no containers yet, so include_containers_in_inventory is ignored.
         """
-        pass
+        item = None
+        if include_inventory:
+            item = self.__inventory.index.get(name)
+        if not item and include_location and self.location:
+            item = self.location.items.index.get(name)
+        return item
 
     def move(self, location: Location) -> None:
         self.location.livings.discard(self)
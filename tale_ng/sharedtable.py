@@ -0,0 +1,168 @@
+"""
+Read-only tables in a memory mapped file, that many processes can share.
+
+A SharedTable is an immutable mapping of str -> value, of which the keys and the (marshaled) values
+live in a buffer: usually a read-only memory mapped file. A lookup hashes the key into the open addressing
+table in the buffer, and only creates Python objects for the key and the value that are asked for.
+Nothing in the buffer is ever written to (not even reference counts, unlike regular Python objects),
+so the worker processes that are forked after mapping the file all share one physical copy of it.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import marshal
+import mmap
+import os
+import zlib
+from array import array
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Sequence, Union
+
+
+class SharedTable(Mapping[str, Any]):
+    """
+    Immutable mapping in a buffer that has been made by encode_table.
+    The keys are iterated in sorted order. The optional decode function converts the
+    unmarshaled values back into what was encoded (for instance, to restore enum values).
+    """
+
+    def __init__(self, buffer: memoryview, decode: Optional[Callable[[Any], Any]] = None) -> None:
+        count, slots = buffer[:8].cast("I")
+        ints = buffer[:4 * (3 + slots + 2 * count)].cast("I")
+        self._count = count
+        self._mask = slots - 1
+        self._slots = ints[2:2 + slots]
+        self._key_start = ints[2 + slots:3 + slots + count]    # the value of entry i ends where the key of entry i+1 starts
+        self._value_start = ints[3 + slots + count:]
+        self._data = buffer[4 * (3 + slots + 2 * count):]
+        self._decode = decode
+
+    def _find(self, key: object) -> int:
+        """the number of the entry with the key, or -1 if it's not in the table"""
+        if not isinstance(key, str):
+            return -1
+        encoded = key.encode("utf-8")
+        slot = zlib.crc32(encoded) & self._mask
+        while True:
+            entry = self._slots[slot]
+            if not entry:
+                return -1
+            if self._data[self._key_start[entry - 1]:self._value_start[entry - 1]] == encoded:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def __getitem__(self, key: str) -> Any:
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        value = marshal.loads(self._data[self._value_start[index]:self._key_start[index + 1]])
+        return self._decode(value) if self._decode else value
+
+    def __contains__(self, key: object) -> bool:
+        return self._find(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self.key(index)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self) -> str:
+        return "<SharedTable of %d entries>" % self._count
+
+    def key(self, index: int) -> str:
+        """the key of the entry with the given number (in sorted order)"""
+        return str(self._data[self._key_start[index]:self._value_start[index]], "utf-8")
+
+
+class SortedKeys(Sequence[str]):
+    """The keys of a SharedTable as a read-only sorted sequence (that can be indexed and sliced)."""
+
+    def __init__(self, table: SharedTable) -> None:
+        self.table = table
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self.table.key(i) for i in range(*index.indices(len(self.table)))]
+        if index < 0:
+            index += len(self.table)
+        if not 0 <= index < len(self.table):
+            raise IndexError(index)
+        return self.table.key(index)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+def encode_table(entries: Mapping[str, Any], encode: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Encodes the mapping for a SharedTable. The values must be marshalable (after the optional encode function).
+    The layout, in native unsigned 32-bit ints: count, number of slots, slots (entry number + 1, or 0 when empty),
+    for every entry the start of its key in the data (plus the end of the data), for every entry the start of its value;
+    followed by the data: the utf-8 encoded key and the marshaled value of every entry, in sorted order of the keys.
+    """
+    keys = sorted(entries)
+    slots = 2
+    while slots < 2 * len(keys):
+        slots *= 2
+    table = array("I", [0]) * slots
+    key_start = array("I")
+    value_start = array("I")
+    data = bytearray()
+    for index, key in enumerate(keys):
+        encoded = key.encode("utf-8")
+        key_start.append(len(data))
+        data += encoded
+        value_start.append(len(data))
+        value = entries[key]
+        data += marshal.dumps(encode(value) if encode else value)
+        slot = zlib.crc32(encoded) & (slots - 1)
+        while table[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = index + 1
+    key_start.append(len(data))
+    data += bytes(-len(data) % 4)   # the next table in the file will be aligned
+    return array("I", [len(keys), slots]).tobytes() + table.tobytes() + key_start.tobytes() + value_start.tobytes() + bytes(data)
+
+
+def write_tables(path: str, header: bytes, tables: Dict[str, bytes]) -> None:
+    """
+    Writes the encoded tables to a file that starts with the header (its length must be a multiple of 4).
+    The directory of the tables is at the end. The file is replaced atomically.
+    """
+    temp_path = path + ".tmp"
+    directory = {}
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        offset = len(header)
+        for name, encoded in tables.items():
+            file.write(encoded)
+            directory[name] = (offset, len(encoded))
+            offset += len(encoded)
+        encoded_directory = marshal.dumps(directory)
+        file.write(encoded_directory)
+        file.write(array("I", [offset, len(encoded_directory)]).tobytes())
+    os.replace(temp_path, path)
+
+
+def open_tables(path: str, header: bytes, decoders: Optional[Dict[str, Callable[[Any], Any]]] = None) \
+        -> Optional[Dict[str, SharedTable]]:
+    """
+    Memory maps the file and returns its tables, or None if the file is empty or doesn't start with the header.
+    The file remains mapped for as long as any of the tables are in use.
+    """
+    decoders = decoders or {}
+    with open(path, "rb") as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None     # empty file
+    view = memoryview(mapped)
+    if view[:len(header)] != header:
+        view.release()
+        mapped.close()
+        return None
+    directory_offset, directory_length = view[-8:].cast("I")
+    directory = marshal.loads(view[directory_offset:directory_offset + directory_length])
+    return {name: SharedTable(view[offset:offset + length], decoders.get(name)) for name, (offset, length) in directory.items()}
@@ -0,0 +1,10 @@
+"""
+Compiles the soul tables (see the tables module).
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+from . import tables
+
+tables.main()
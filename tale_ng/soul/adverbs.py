@@ -1,5 +1,5 @@
-import bisect
-from typing import List
+from typing import Collection, List, Optional
+from ..textindex import PrefixIndex, SpellIndex
 
 ADVERBS = {
     "abjectly",
@@ -2238,21 +2238,47 @@ ADVERBS = {
 
 ALPHABETICALLY = list(sorted(ADVERBS))
 
+_prefix_index: Optional[PrefixIndex] = None
+_spell_index: Optional[SpellIndex] = None
+
+
+def prefix_index(table: Optional[Collection[str]] = None) -> PrefixIndex:
+    """
+    the prefix index of the adverbs, built on first use.
+    For another adverb table (such as one that has been replaced by a reload since) a new index is built.
+    """
+    global _prefix_index
+    if table is not None and table is not ADVERBS:
+        return PrefixIndex(table)
+    if _prefix_index is None:
+        _prefix_index = PrefixIndex(ADVERBS)
+    return _prefix_index
+
+
+def spell_index(table: Optional[Collection[str]] = None) -> SpellIndex:
+    """
+    the spelling index of the adverbs, built on first use.
+    For another adverb table (such as one that has been replaced by a reload since) a new index is built.
+    """
+    global _spell_index
+    if table is not None and table is not ADVERBS:
+        return SpellIndex(table, max_distance=1)
+    if _spell_index is None:
+        _spell_index = SpellIndex(ADVERBS, max_distance=1)
+    return _spell_index
+
 
 def search_prefix(prefix: str, amount: int = 5) -> List[str]:
     """
     Return a list of adverbs starting with the given prefix, up to the given amount
-    Uses binary search in the sorted adverbs list, O(log n)
+    Uses a prefix index that is built on first use, O(k) in the length of the prefix
+    """
+    return prefix_index().search(prefix, amount)
+
+
+def suggest(word: str, amount: int = 5) -> List[str]:
+    """
+    Return a list of adverbs that are one typo (missing, extra, wrong or swapped letter) away from the word.
+    Uses a spelling index that is built on first use.
     """
-    i = bisect.bisect_left(ALPHABETICALLY, prefix)
-    if i >= len(ALPHABETICALLY):
-        return []
-    elif ALPHABETICALLY[i].startswith(prefix):
-        j = i + 1
-        amount = min(amount, len(ALPHABETICALLY) - i)  # avoid reading past the end of the list
-        while amount > 1 and ALPHABETICALLY[j].startswith(prefix):
-            j += 1
-            amount -= 1
-        return ALPHABETICALLY[i:j]
-    else:
-        return []
+    return spell_index().suggest(word, amount)
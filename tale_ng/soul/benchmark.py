@@ -0,0 +1,177 @@
+"""
+Benchmark of the soul's parser and message generation.
+
+Builds a synthetic location populated with livings, items (with multi-word names and aliases)
+and exits, and replays a corpus of commands that covers every verb type, qualifiers, bodyparts,
+pronouns and the common error paths. Reports the throughput and the latency percentiles.
+
+Run it with:  python -m tale_ng.soul.benchmark --help
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple, Optional, Sequence
+from . import verbs
+from .parse import Soul, ParseError
+from .instrumentation import Instrumentation
+from ..objects import Location, Living, Item, Exit
+
+
+ADJECTIVES = ["rusty", "shiny", "old", "small", "heavy", "golden", "wooden", "dusty", "broken", "strange"]
+NOUNS = ["key", "sword", "lamp", "box", "coin", "book", "ring", "bottle", "shield", "scroll"]
+DIRECTIONS = ["north", "south", "east", "west", "up", "down", "northeast", "northwest", "southeast", "southwest"]
+VERBS_PER_TYPE = 3
+
+
+def build_location(livings: int, items: int, exits: int, seed: int = 42) -> Tuple[Location, Living]:
+    """
+    Builds a location with the given number of livings (excluding the player), items and exits.
+    Items get multi-word names ("rusty iron key 3") with an alias, some exits have a multi-word name as well.
+    Returns the location and the player in it.
+    """
+    rnd = random.Random(seed)
+    location = Location("benchmark hall")
+    player = Living("julie", "f")
+    player.move(location)
+    for number in range(livings):
+        Living("npc%d" % number, rnd.choice("mfn"), title="Npc %d" % number).move(location)
+    for number in range(items):
+        adjective, noun = rnd.choice(ADJECTIVES), rnd.choice(NOUNS)
+        location.items.add(Item("%s %s %d" % (adjective, noun, number), aliases={"%s%d" % (noun, number)}))
+    for number in range(exits):
+        direction = DIRECTIONS[number % len(DIRECTIONS)]
+        if number >= len(DIRECTIONS):
+            direction = "%s gate %d" % (direction, number)
+        Exit(direction, "somewhere", "a way " + direction).bind(location)
+    return location, player
+
+
+def build_corpus(location: Location, seed: int = 42) -> List[str]:
+    """Builds the list of commands to replay in the given location."""
+    rnd = random.Random(seed)
+    npcs = sorted(living.name for living in location.livings if living.name.startswith("npc")) or ["julie"]
+    items = sorted(item.name for item in location.items) or ["nothing"]
+    exits = sorted(location.exits) or ["nowhere"]
+    bodyparts = sorted(verbs.BODY_PARTS)
+    qualifiers = ["suddenly", "fail", "pretend", "don't", "attempt"]
+    commands = []
+    for vtype in verbs.VerbType:
+        type_verbs = sorted(verb for verb, data in verbs.VERBS.items() if data[0] == vtype)[:VERBS_PER_TYPE]
+        for verb in type_verbs:
+            npc = rnd.choice(npcs)
+            commands.extend([
+                verb,
+                "%s %s" % (verb, npc),
+                "%s at %s and %s" % (verb, npc, rnd.choice(npcs)),
+                "%s %s %s" % (rnd.choice(qualifiers), verb, npc),
+                "%s %s on the %s" % (verb, npc, rnd.choice(bodyparts)),
+                "%s %s" % (verb, rnd.choice(items)),
+                "%s %s 'a quoted message, don't you think'" % (verb, npc),
+                "%s him" % verb,
+            ])
+    commands.extend([
+        "smile happily at everyone",
+        "grin at all but %s" % npcs[0],
+        "wave at them",
+        "nod to the %s" % rnd.choice(exits),
+        "kick myself",
+        rnd.choice(exits),
+        "go " + rnd.choice(exits),
+        # error paths
+        "xyzzy",
+        "smile at %s" % npcs[0][:2],
+        "smile undefinedword",
+        "grin sic",
+        "crawl nowhere",
+        "kick everything",
+    ])
+    return commands
+
+
+class BenchmarkResult:
+    """The timings of a benchmark run. Latencies are in seconds per command."""
+
+    def __init__(self, latencies: Sequence[float], errors: int) -> None:
+        self.latencies = sorted(latencies)
+        self.commands = len(latencies)
+        self.errors = errors
+        self.total_time = sum(latencies)
+
+    @property
+    def commands_per_second(self) -> float:
+        return self.commands / self.total_time if self.total_time else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """latency at the given percentile (nearest rank)"""
+        if not self.latencies:
+            return 0.0
+        rank = max(0, min(self.commands - 1, int(round(percent / 100.0 * self.commands + 0.5)) - 1))
+        return self.latencies[rank]
+
+    def report(self) -> str:
+        lines = [
+            "commands:   %d (%d errors)" % (self.commands, self.errors),
+            "total time: %.3f sec" % self.total_time,
+            "throughput: %.0f commands/sec" % self.commands_per_second,
+        ]
+        for percent in (50, 90, 99, 100):
+            lines.append("latency p%-3d %.1f usec" % (percent, self.percentile(percent) * 1e6))
+        return "\n".join(lines)
+
+
+def run(livings: int = 50, items: int = 50, exits: int = 6, rounds: int = 20, process: bool = True,
+        soul: Optional[Soul] = None, seed: int = 42) -> BenchmarkResult:
+    """
+    Replays the command corpus the given number of rounds, in a location populated as specified.
+    If process is True, Soul.process_verb is timed (parsing and message generation), otherwise only Soul.parse.
+    Successfully parsed commands are remembered for pronoun resolution, like a driver would do.
+    """
+    location, player = build_location(livings, items, exits, seed)
+    commands = build_corpus(location, seed)
+    soul = soul or Soul()
+    timer = time.perf_counter
+    latencies = []
+    errors = 0
+    for _ in range(rounds):
+        for command in commands:
+            start = timer()
+            try:
+                parsed = soul.parse(player, command)
+                if process:
+                    soul.process_verb_parsed(player, parsed)
+            except ParseError:
+                latencies.append(timer() - start)
+                errors += 1
+            else:
+                latencies.append(timer() - start)
+                soul.remember_previous_parse(parsed, player)
+    return BenchmarkResult(latencies, errors)
+
+
+def main(args: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the soul's command parser.")
+    parser.add_argument("-l", "--livings", type=int, default=50, help="number of livings in the room")
+    parser.add_argument("-i", "--items", type=int, default=50, help="number of items in the room")
+    parser.add_argument("-e", "--exits", type=int, default=6, help="number of exits in the room")
+    parser.add_argument("-r", "--rounds", type=int, default=20, help="number of times to replay the command corpus")
+    parser.add_argument("-p", "--parse-only", action="store_true", help="only parse, don't generate the messages")
+    parser.add_argument("-c", "--cache", type=int, default=0, help="size of the parse cache (default: no cache)")
+    parser.add_argument("-a", "--abbreviate", action="store_true", help="accept abbreviated verbs")
+    parser.add_argument("-s", "--stages", action="store_true", help="also report the time spent in each stage")
+    options = parser.parse_args(args)
+    soul = Soul(parse_cache_size=options.cache, abbreviate_verbs=options.abbreviate)
+    if options.stages:
+        soul.instrumentation = Instrumentation()
+    result = run(options.livings, options.items, options.exits, options.rounds, process=not options.parse_only, soul=soul)
+    print(result.report())
+    if soul.instrumentation:
+        print()
+        print(soul.instrumentation.report())
+
+
+if __name__ == "__main__":
+    main()
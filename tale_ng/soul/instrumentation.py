@@ -0,0 +1,80 @@
+"""
+Opt-in timing instrumentation of the soul's parser and message generation.
+
+Assign an Instrumentation object to Soul.instrumentation to collect the duration of the
+stages of every parse (tokenizing, finding the verb, name matching, ...) and the latency per verb.
+When no instrumentation is set, the soul only does a few 'is None' checks.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import bisect
+import time
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Sequence, Tuple
+
+
+ERROR_VERB = "(error)"   # verb under which the latencies of commands that resulted in a parse error are recorded
+DEFAULT_BUCKETS = (10e-6, 20e-6, 50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3)  # upper bounds in seconds
+
+
+class Instrumentation:
+    """
+    Collects per-stage durations and counts, and per-verb latencies.
+    The soul calls start() at the beginning of an operation ("parse" or "process"), lap(stage)
+    at the end of every stage, and finish(operation, verb) at the end of the operation.
+    A stage can occur many times in one operation (for instance, name matching for every word).
+    Not thread-safe: use one Instrumentation per Soul per thread.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.stage_times: DefaultDict[str, float] = defaultdict(float)
+        self.stage_counts: DefaultDict[str, int] = defaultdict(int)
+        self.latencies: DefaultDict[Tuple[str, str], List[float]] = defaultdict(list)   # (operation, verb) -> durations
+        self._start = self._last = 0.0
+
+    def start(self) -> None:
+        self._start = self._last = self.clock()
+
+    def lap(self, stage: str) -> None:
+        """Attributes the time since the previous lap (or the start) to the given stage."""
+        now = self.clock()
+        self.stage_times[stage] += now - self._last
+        self.stage_counts[stage] += 1
+        self._last = now
+
+    def finish(self, operation: str, verb: str) -> None:
+        """Records the latency of the whole operation for the given verb."""
+        now = self.clock()
+        self.latencies[operation, verb].append(now - self._start)
+        self._last = now
+
+    def clear(self) -> None:
+        self.stage_times.clear()
+        self.stage_counts.clear()
+        self.latencies.clear()
+
+    def verbs(self, operation: str = "parse") -> List[str]:
+        return sorted(verb for op, verb in self.latencies if op == operation)
+
+    def histogram(self, verb: str, operation: str = "parse", buckets: Sequence[float] = DEFAULT_BUCKETS) -> List[int]:
+        """
+        Counts the latencies of the verb per bucket. Buckets are the (sorted) upper bounds in seconds,
+        the result has one extra count at the end for the latencies above the last bucket.
+        """
+        counts = [0] * (len(buckets) + 1)
+        for latency in self.latencies.get((operation, verb), []):
+            counts[bisect.bisect_left(buckets, latency)] += 1
+        return counts
+
+    def stage_report(self) -> Dict[str, Tuple[int, float]]:
+        """stage -> (count, total time)"""
+        return {stage: (self.stage_counts[stage], self.stage_times[stage]) for stage in self.stage_times}
+
+    def report(self) -> str:
+        lines = ["%-16s %8s %12s" % ("stage", "count", "total usec")]
+        for stage, (count, total) in sorted(self.stage_report().items(), key=lambda item: -item[1][1]):
+            lines.append("%-16s %8d %12.1f" % (stage, count, total * 1e6))
+        return "\n".join(lines)
@@ -8,18 +8,126 @@ The verb parsing and message generation have been fully rewritten.
 Copyright by Irmen de Jong (irmen@razorvine.net)
 """
 
-import re
-from collections import defaultdict
-from typing import Tuple, AbstractSet, Optional, List, MutableMapping, Mapping, Sequence
-from . import verbs, adverbs
+import copy
+import weakref
+from types import MappingProxyType
+from enum import Enum
+from collections import OrderedDict, deque
+from typing import Tuple, AbstractSet, Optional, List, Mapping, Sequence, Dict, Union, Hashable, FrozenSet, Iterable, Deque, \
+    NamedTuple, Callable
+from . import verbs, adverbs, templates
+from .instrumentation import Instrumentation, ERROR_VERB
+from .registry import VerbRegistry
 from .. import lang
-from ..objects import MudObject, Living
+from ..objects import MudObject, Living, Location, Exit
+from ..nameindex import NameIndex, NameMap, WordTrie, match_longest, search_prefix
+from ..textindex import PrefixIndex, SpellIndex
 from ..errors import TaleError
 
 
+ExternalVerbs = Union[AbstractSet[str], VerbRegistry]   # the verbs that are handled elsewhere, or a registry of all verbs
+
+
+class ErrorCode(Enum):
+    """What went wrong while parsing, see MESSAGES for the text that is shown to the user."""
+    MESSAGE = 0             # a ParseError that was created with just a message text
+    NOTHING = 1             # empty input
+    MOVE_WHERE = 2          # a movement verb without a direction
+    EXIT_EXTRA_WORDS = 3    # an exit name followed by more words
+    CANT_MOVE_THERE = 4     # a movement verb with a direction that isn't an exit
+    BOTH_BODYPARTS = 5
+    NOBODY_HERE = 6
+    EVERYTHING = 7
+    BOTH_ADVERBS = 8
+    NAME_PREFIX = 9         # the word is the start of the name of things that are here (the candidates)
+    ADVERB_PREFIX = 10      # the word is the start of multiple adverbs (the candidates)
+    MISPLACED_WORD = 11     # a verb, qualifier or bodypart at the wrong place
+    ADVERB_TYPO = 12        # the word is a misspelling of the adverbs (the candidates)
+    UNCLEAR_WORD = 13
+    UNCLEAR_PRONOUN = 14    # a pronoun that doesn't refer to anything
+    NO_LONGER_AROUND = 15   # a pronoun that refers to something that is gone
+    NEEDS_PERSON = 16
+    DUPLICATE_TARGETS = 17  # the same targets (the candidates) occur more than once
+    NON_SOUL_VERB = 18
+    UNKNOWN_VERB = 19
+    AMBIGUOUS_VERB = 20
+
+
+# the message templates of the error codes. The fields are: word, Word (capitalized), other,
+# candidates (joined with 'or') and names (the candidates joined with 'and')
+MESSAGES = {
+    ErrorCode.NOTHING: "What?",
+    ErrorCode.MOVE_WHERE: "{Word} where?",
+    ErrorCode.EXIT_EXTRA_WORDS: "What do you want to do with that?",
+    ErrorCode.CANT_MOVE_THERE: "You can't {word} there.",
+    ErrorCode.BOTH_BODYPARTS: "You can't do that both {other} and {word}.",
+    ErrorCode.NOBODY_HERE: "There is nobody here.",
+    ErrorCode.EVERYTHING: "You can't do something to everything around you, be more specific.",
+    ErrorCode.BOTH_ADVERBS: "You can't do that both {other} and {word}.",
+    ErrorCode.NAME_PREFIX: "Perhaps you meant {candidates}?",
+    ErrorCode.ADVERB_PREFIX: "What adverb did you mean: {candidates}?",
+    ErrorCode.MISPLACED_WORD: "The word {word} makes no sense at that location.",
+    ErrorCode.ADVERB_TYPO: "Perhaps you meant {candidates}?",
+    ErrorCode.UNCLEAR_WORD: "It's not clear what you mean by '{word}'.",
+    ErrorCode.UNCLEAR_PRONOUN: "It is not clear who or what you're referring to.",
+    ErrorCode.NO_LONGER_AROUND: "{Word} is no longer around.",
+    ErrorCode.NEEDS_PERSON: "The verb {word} needs a person.",
+    ErrorCode.DUPLICATE_TARGETS: "You can do only one thing at the same time with {names}. Try to use multiple separate commands instead.",
+    ErrorCode.NON_SOUL_VERB: "{word}",     # these are normally handled by the engine, the text is just the verb
+    ErrorCode.UNKNOWN_VERB: "{word}",
+    ErrorCode.AMBIGUOUS_VERB: "{word}",
+}
+
+
 class ParseError(TaleError):
-    """Problem with parsing the user input. Should be shown to the user as a nice error message."""
-    pass
+    """
+    Problem with parsing the user input. Should be shown to the user as a nice error message.
+    Carries the error code and the details: the offending word, the candidates (what the user might have meant),
+    another word that is involved, and the position of the offending word in the command (-1 if unknown).
+    The message text is only rendered when it is asked for: str(error), error.message or error.args[0]
+    (as with other exceptions, the args are the message). A ParseError can also be created with just a message text.
+    """
+
+    def __init__(self, code: Union[ErrorCode, str], word: str = "", candidates: Sequence[str] = (),
+                 other: str = "", position: int = -1) -> None:
+        super().__init__(code)
+        if isinstance(code, ErrorCode):
+            self.code = code
+            self._message: Optional[str] = None
+        else:
+            self.code = ErrorCode.MESSAGE
+            self._message = code
+        self.word = word
+        self.candidates = candidates
+        self.other = other
+        self.position = position
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            message = MESSAGES[self.code]
+            if "{" in message:
+                word, other, candidates = self.word, self.other, self.candidates
+                if self.code is ErrorCode.BOTH_BODYPARTS:
+                    word, other = verbs.BODY_PARTS.get(word, word), verbs.BODY_PARTS.get(other, other)
+                message = message.format(word=word, Word=lang.capital(word), other=other,
+                                         candidates=lang.join(candidates, conj="or") if candidates else "",
+                                         names=lang.join(candidates) if candidates else "")
+            if self.code is ErrorCode.UNCLEAR_WORD and self.word[:1].isupper():
+                message += " Just type in lowercase ('%s')." % self.word.lower()
+            self._message = message
+        return self._message
+
+    @property
+    def args(self) -> Tuple[str]:
+        return (self.message,)
+
+    @args.setter
+    def args(self, args: Tuple[str, ...]) -> None:
+        self._message = args[0] if args else ""
+
+    def __str__(self) -> str:
+        return self.message
 
 
 class NonSoulVerbError(ParseError):
@@ -30,7 +138,7 @@ class NonSoulVerbError(ParseError):
     """
 
     def __init__(self, parseresult) -> None:
-        super().__init__(parseresult.verb)
+        super().__init__(ErrorCode.NON_SOUL_VERB, parseresult.verb)
         self.parsed = parseresult
 
 
@@ -39,30 +147,70 @@ class UnknownVerbError(ParseError):
     The soul doesn't recognise the verb that the user typed.
     The engine can and should search for other places that define this verb first.
     If nothing recognises it, this error should be shown to the user in a nice way.
+    The suggestions are the known verbs (soul verbs and external verbs) that are one typo away, closest first.
+    They can be given, or else are only searched for (with the suggest function) when they are asked for:
+    an unknown verb is the normal case for the commands that the engine handles itself.
     """
 
-    def __init__(self, verb: str, words: Sequence[str], qualifier: str) -> None:
-        super().__init__(verb)
+    code_for_class = ErrorCode.UNKNOWN_VERB
+
+    def __init__(self, verb: str, words: Sequence[str], qualifier: str, suggestions: Optional[Sequence[str]] = None,
+                 registry: Optional[ExternalVerbs] = None,
+                 suggest: Optional[Callable[[str, Optional[ExternalVerbs]], Sequence[str]]] = None) -> None:
+        super().__init__(self.code_for_class, verb)
         self.verb = verb
         self.words = words
         self.qualifier = qualifier
+        self.registry = registry
+        self._suggest = suggest
+        self._suggestions = suggestions
+
+    @property
+    def suggestions(self) -> Sequence[str]:
+        if self._suggestions is None:
+            self._suggestions = self._suggest(self.verb, self.registry) if self._suggest else ()
+        return self._suggestions
+
+    @property
+    def candidates(self) -> Sequence[str]:
+        return self.suggestions
+
+    @candidates.setter
+    def candidates(self, candidates: Sequence[str]) -> None:
+        self._suggestions = candidates or None
+
+
+class AmbiguousVerbError(UnknownVerbError):
+    """
+    The verb the user typed is an abbreviation of multiple verbs (the suggestions).
+    This is an UnknownVerbError so that the engine can still search other places that define the verb.
+    """
+    code_for_class = ErrorCode.AMBIGUOUS_VERB
 
 
 class ParseResult:
-    """Captures the result of a parsed input line."""
+    """
+    Captures the result of a parsed input line.
+    The targets (whos) are stored as parallel arrays in the order in which they occur in the line:
+    who_objects, who_sequences and who_previous_words. The index and the who_info mapping are only built when they are used.
+    who_info is a read-only view and who_count is a read-only property: change the targets with add_who, remove_who and clear_who.
+    """
+    __slots__ = ("verb", "adverb", "message", "bodypart", "qualifier", "args", "unrecognized", "unparsed",
+                 "who_objects", "who_sequences", "who_previous_words", "_who_index", "_who_info")
 
     class WhoInfo:
         """parse details of this Who in the line"""
+        __slots__ = ("sequence", "previous_word")
 
-        def __init__(self, seqnr: int = 0) -> None:
+        def __init__(self, seqnr: int = 0, previous_word: str = "") -> None:
             self.sequence = seqnr  # at what position does this Who occur
-            self.previous_word = ""  # what is the word preceding it
+            self.previous_word = previous_word  # what is the word preceding it
 
         def __str__(self) -> str:
             return "[seq=%d, prev_word=%s]" % (self.sequence, self.previous_word)
 
     def __init__(self, verb: str, *, adverb: str = "", message: str = "", bodypart: str = "", qualifier: str = "",
-                 args: List[str] = None, who_info: MutableMapping[MudObject, WhoInfo] = None,
+                 args: List[str] = None, who_info: Mapping[MudObject, WhoInfo] = None,
                  unrecognized: List[str] = None, unparsed: str = "", who_list: List[MudObject] = None) -> None:
         self.verb = verb
         self.adverb = adverb
@@ -72,20 +220,25 @@ class ParseResult:
         self.args = args or []
         self.unrecognized = unrecognized or []
         self.unparsed = unparsed
-        self.who_info = who_info or defaultdict(ParseResult.WhoInfo)
-        if who_list and not self.who_info:
-            # initialize the who_info dictionary from the given list and check for duplicates
+        self.who_objects: List[MudObject] = []
+        self.who_sequences: List[int] = []
+        self.who_previous_words: List[str] = []
+        self._who_index: Optional[Dict[MudObject, int]] = None
+        self._who_info: Optional[Dict[MudObject, ParseResult.WhoInfo]] = None
+        if who_info:
+            for who, info in who_info.items():
+                self.add_who(who, getattr(info, "sequence", len(self.who_objects)), getattr(info, "previous_word", ""))
+        elif who_list:
+            # initialize the whos from the given list and check for duplicates
             # if who_info is ALSO provided, we ignore who_list.
             duplicates = set()
             for sequence, who in enumerate(who_list):
-                if who in self.who_info:
+                if self._find_who(who) >= 0:
                     duplicates.add(who)
-                self.who_info[who] = ParseResult.WhoInfo(sequence)
+                else:
+                    self.add_who(who, sequence)
             if duplicates:
-                raise ParseError(
-                    "You can do only one thing at the same time with {}. Try to use multiple separate commands instead."
-                        .format(lang.join(s.name for s in duplicates)))
-        self.who_count = len(self.who_info)
+                raise ParseError(ErrorCode.DUPLICATE_TARGETS, candidates=[who.name for who in duplicates])
 
     def __str__(self) -> str:
         who_info_str = [" %s->%s" % (living.name, info) for living, info in self.who_info.items()]
@@ -104,10 +257,69 @@ class ParseResult:
         ]
         return "\n".join(s)
 
+    def copy(self) -> "ParseResult":
+        """copy of the parse result, sharing only the (referenced) mud objects"""
+        new = copy.copy(self)
+        new.args = list(self.args)
+        new.unrecognized = list(self.unrecognized)
+        new.who_objects = list(self.who_objects)
+        new.who_sequences = list(self.who_sequences)
+        new.who_previous_words = list(self.who_previous_words)
+        new._who_index = new._who_info = None
+        return new
+
+    def _find_who(self, who: MudObject) -> int:
+        if self._who_index is None:
+            self._who_index = {obj: index for index, obj in enumerate(self.who_objects)}
+        return self._who_index.get(who, -1)
+
+    def add_who(self, who: MudObject, sequence: int, previous_word: str = "") -> None:
+        """Adds a target. If it is already present, only its sequence and previous word are updated."""
+        self._who_info = None
+        index = self._find_who(who)
+        if index >= 0:
+            self.who_sequences[index] = sequence
+            self.who_previous_words[index] = previous_word
+        else:
+            self._who_index[who] = len(self.who_objects)     # type: ignore
+            self.who_objects.append(who)
+            self.who_sequences.append(sequence)
+            self.who_previous_words.append(previous_word)
+
+    def remove_who(self, who: MudObject) -> bool:
+        """Removes a target. Returns False if it wasn't present."""
+        index = self._find_who(who)
+        if index < 0:
+            return False
+        self._who_index = self._who_info = None
+        del self.who_objects[index]
+        del self.who_sequences[index]
+        del self.who_previous_words[index]
+        return True
+
+    def clear_who(self) -> None:
+        self._who_index = self._who_info = None
+        self.who_objects.clear()
+        self.who_sequences.clear()
+        self.who_previous_words.clear()
+
+    @property
+    def who_info(self) -> Mapping[MudObject, WhoInfo]:
+        """The targets with their parse details, in order of occurrence in the line (a read-only view)."""
+        if self._who_info is None:
+            self._who_info = {who: ParseResult.WhoInfo(sequence, previous_word) for who, sequence, previous_word
+                              in zip(self.who_objects, self.who_sequences, self.who_previous_words)}
+        return MappingProxyType(self._who_info)
+
+    @property
+    def who_count(self) -> int:
+        """The number of targets (read-only)."""
+        return len(self.who_objects)
+
     @property
     def who_1(self) -> Optional[MudObject]:
         """Gets the first occurring ParsedWhoType from the parsed line (or None if it doesn't exist)"""
-        return next(iter(self.who_info)) if self.who_info else None     # type: ignore
+        return self.who_objects[0] if self.who_objects else None
 
     @property
     def who_12(self) -> Tuple[Optional[MudObject], Optional[MudObject]]:
@@ -115,8 +327,8 @@ class ParseResult:
         Returns a tuple (ParsedWhoType, ParsedWhoType) representing the first two occurring Whos in the parsed line.
         If no such subject exists, None is returned in its place.
         """
-        whos = list(self.who_info)    # this is in order because who_info is OrderedDict
-        return tuple((whos + [None, None])[:2])  # type: ignore
+        whos = self.who_objects
+        return (whos[0] if whos else None), (whos[1] if len(whos) > 1 else None)
 
     @property
     def who_123(self) -> Tuple[Optional[MudObject], Optional[MudObject], Optional[MudObject]]:
@@ -124,15 +336,205 @@ class ParseResult:
         Returns a tuple (ParsedWhoType, ParsedWhoType, ParsedWhoType) representing the first three occurring Whos in the parsed line.
         If no such subject exists, None is returned in its place.
         """
-        whos = list(self.who_info)    # this is in order because who_info is OrderedDict
-        return tuple((whos + [None, None, None])[:3])  # type: ignore
+        whos = self.who_objects
+        return (whos[0] if whos else None), (whos[1] if len(whos) > 1 else None), (whos[2] if len(whos) > 2 else None)
 
     @property
     def who_last(self) -> Optional[MudObject]:
         """Gets the last occurring ParsedWhoType on the line (or None if there wasn't any)"""
-        if self.who_info:
-            return list(self.who_info)[-1]
-        return None
+        return self.who_objects[-1] if self.who_objects else None
+
+
+class VerbMessage:
+    """
+    The message of a soul verb, rendered lazily for every observer: the actor ("You smile at Kate."),
+    one of the targets ("Julie smiles at you.") or a bystander ("Julie smiles at Kate.").
+    A text is rendered only when it is asked for, and then cached. All bystanders share the same text,
+    so in a crowded room only the actor and the targets that actually receive the message cost a rendering.
+    """
+    __slots__ = ("soul", "actor", "targets", "_target_set", "_template", "_room_template", "_qual_action", "_qual_room",
+                 "_values", "_rendered", "_target_message")
+
+    def __init__(self, soul: 'Soul', actor: Living, targets: Sequence[MudObject], template: templates.VerbTemplate,
+                 room_template: str, qual_action: str, qual_room: str, values: Dict[str, str]) -> None:
+        self.soul = soul
+        self.actor = actor
+        self.targets = tuple(targets)
+        self._target_set = frozenset(targets)
+        self._template = template
+        self._room_template = room_template
+        self._qual_action = qual_action
+        self._qual_room = qual_room
+        self._values = values   # the slot values that are the same for every observer
+        self._rendered: Dict[Optional[MudObject], str] = {}
+        self._target_message = ""
+
+    def render(self, observer: Optional[MudObject]) -> str:
+        """The message as the observer sees it. Anyone who isn't the actor or a target (or None) is a bystander."""
+        if observer is not self.actor and observer not in self._target_set:
+            observer = None
+        try:
+            return self._rendered[observer]
+        except KeyError:
+            text = self._rendered[observer] = self._render(observer)
+            return text
+
+    @property
+    def actor_message(self) -> str:
+        return self.render(self.actor)
+
+    @property
+    def room_message(self) -> str:
+        """the message for the bystanders"""
+        return self.render(None)
+
+    @property
+    def target_message(self) -> str:
+        """
+        The message for the targets in which the targets are all replaced by 'you' ("Julie smiles at you.").
+        This is the target message that process_verb_parsed returns; render(target) names the other targets too.
+        """
+        if not self._target_message:
+            values = dict(self._values, who=" you", poss=" your", subj=" you")
+            values["is"] = " are"
+            self._target_message = self._finish(values, False)
+        return self._target_message
+
+    def _render(self, observer: Optional[MudObject]) -> str:
+        actor, targets, slots = self.actor, self.targets, self._template.slots
+        values = dict(self._values)
+        if "who" in slots:
+            values["who"] = " " + lang.join([self.soul.who_replacement(actor, target, observer) for target in targets])
+        if "poss" in slots:
+            if len(targets) == 1:
+                values["poss"] = " " + Soul.poss_replacement(actor, targets[0], observer)
+            else:
+                values["poss"] = " " + lang.possessive(lang.join([Soul.poss_replacement(actor, target, observer) for target in targets]))
+        if len(targets) != 1:
+            values["subj"], values["is"] = " they", " are"
+        elif observer is targets[0] and observer is not actor:
+            values["subj"], values["is"] = " you", " are"
+        else:
+            values["subj"], values["is"] = " " + getattr(targets[0], "subjective", "it"), " is"  # if no subjective attr, use "it"
+        if observer is actor:
+            values.update(your=" your", my=" your")
+        return self._finish(values, observer is actor)
+
+    def _finish(self, values: Dict[str, str], for_actor: bool) -> str:
+        """fills in the template and adds the actor and the fullstop"""
+        if for_actor:
+            return lang.fullstop("You " + self._qual_action % (self._template.player % values).strip())
+        action = self._qual_room % (self._room_template % values).strip()
+        return lang.capital(lang.fullstop(self.actor.title + " " + action))
+
+
+class ParseScope:
+    """
+    The names that are in scope for parsing commands in a location: the livings, items and exits.
+    This only refers to the name indexes that the location keeps up to date itself,
+    so a scope can be shared by all players in the same location (the player's own inventory is added by the parser).
+    """
+    __slots__ = ("location", "livings", "items", "exits")
+
+    def __init__(self, location: Location) -> None:
+        self.location = location
+        self.livings = location.livings.index
+        self.items = location.items.index
+        self.exits = location.exits
+
+
+class ParseCache:
+    """
+    Bounded LRU cache of parse results.
+    The key contains the versions of all name indexes in the parse scope, so when a living, item or exit
+    enters or leaves (or is renamed) the old entries simply no longer match and age out of the cache.
+    This way a cached result can never refer to an object that is no longer around.
+    Results are copied in and out of the cache because a ParseResult is mutable.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.hits = self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[ParseResult]:
+        try:
+            result = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result.copy()
+
+    def put(self, key: Hashable, result: ParseResult) -> None:
+        self._entries[key] = result.copy()
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+def _unparsed_text(cmd: str, consumed: int) -> str:
+    """the text of a command without quotes after the given number of words, like ParseResult.unparsed"""
+    if not consumed:
+        return cmd
+    parts = cmd.split(None, consumed)
+    return parts[consumed] if len(parts) > consumed else ""
+
+
+class Referent(NamedTuple):
+    """An object that a pronoun can refer to. Only weakly referenced, the subjective is kept for the error message."""
+    ref: Callable[[], Optional[MudObject]]
+    subjective: str
+
+
+class PronounHistory:
+    """
+    The objects a player referred to in the last few commands, to resolve the pronouns (it, him, her, them) to.
+    'them' refers to all objects of the most recent command; 'him', 'her' and 'it' refer to the most recent
+    object with that objective pronoun in the last <size> commands (size 1 means: only in the previous command).
+    The table of pronouns is updated when a command is remembered, so a lookup is a single dict access.
+    Only weak references to the objects are kept, so objects that are removed from the game aren't kept alive.
+    """
+    __slots__ = ("size", "version", "verified", "_commands", "_pronouns")
+
+    def __init__(self, size: int = 1) -> None:
+        self.size = size
+        self.version = 0     # increased on every change
+        self.verified: Dict[str, Hashable] = {}    # pronoun -> the scope in which its objects were last found to be around
+        self._commands: Deque[List[Referent]] = deque(maxlen=size)   # most recent command last
+        self._pronouns: Dict[str, Referent] = {}
+
+    def remember(self, objects: Iterable[MudObject]) -> None:
+        """Remember the objects that were referred to in a command."""
+        self._commands.append([Referent(weakref.ref(obj), obj.subjective) for obj in objects])
+        self._pronouns.clear()
+        for command in self._commands:
+            for referent in reversed(command):
+                # the most recent command wins, and within a command the first object with the pronoun
+                obj = referent.ref()
+                if obj is not None:
+                    self._pronouns[obj.objective] = referent
+        self.verified.clear()
+        self.version += 1
+
+    def lookup(self, pronoun: str) -> List[Referent]:
+        if pronoun == "them":
+            return self._commands[-1] if self._commands else []
+        referent = self._pronouns.get(pronoun)
+        return [referent] if referent else []
+
+    def clear(self) -> None:
+        self._commands.clear()
+        self._pronouns.clear()
+        self.verified.clear()
+        self.version += 1
 
 
 class Soul:
@@ -142,26 +544,101 @@ class Soul:
     Verbs that actually do something in the environment (not purely social messages) are implemented elsewhere.
     """
 
-    _quoted_message_regex = re.compile(
-        r"('(?P<msg1>.*)')|(\"(?P<msg2>.*)\")")  # greedy single-or-doublequoted string match
     _skip_words = {"and", "&", "at", "to", "before", "in", "into", "on", "off", "onto",
                    "the", "with", "from", "after", "before", "under", "above", "next"}
 
-    def __init__(self) -> None:
-        self.__previously_parsed = ParseResult("")
+    _pronouns = {"them", "him", "her", "it"}
+    # words that the parser understands by themselves, these are not taken as the abbreviation of a verb
+    _not_abbreviations = _skip_words | _pronouns | {"me", "myself", "self", "everyone", "everybody", "all"}
+    _verb_spell_index: Optional[SpellIndex] = None    # spelling index of the soul verbs, built on first use
+    _verb_prefix_index: Optional[PrefixIndex] = None  # prefix index of the soul verbs, built on first use
+    _tables_loaded = False    # have the compiled tables (see the tables module) been loaded, or been replaced?
+
+    def __init__(self, parse_cache_size: int = 0, abbreviate_verbs: bool = False, pronoun_history: int = 1,
+                 verb_registry: Optional[VerbRegistry] = None) -> None:
+        if not Soul._tables_loaded:
+            Soul._tables_loaded = True
+            from . import tables
+            tables.load()   # the compiled soul tables, if they have been built
+        self.pronoun_history_size = pronoun_history     # of how many previous commands the objects are remembered for pronouns
+        self._pronoun_histories: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()   # player -> PronounHistory
+        self._shared_pronoun_history = PronounHistory(pronoun_history)   # for commands that are remembered without a player
+        self.parse_cache = ParseCache(parse_cache_size) if parse_cache_size > 0 else None
+        self.instrumentation: Optional[Instrumentation] = None     # set this to collect timings of the parser
+        self.abbreviate_verbs = abbreviate_verbs    # accept unique prefixes of verbs ("tic" -> "tickle")?
+        # the verbs when no external verbs are given. Register the driver commands here, zones can have a child registry of it.
+        self.verb_registry = verb_registry or VerbRegistry()
+        self._external_registries: Dict[FrozenSet[str], VerbRegistry] = {}
+        # the external verbs of the previous call (kept alive, so it can be compared by identity), a frozen copy and the registry
+        self._last_external: Optional[Tuple[AbstractSet[str], FrozenSet[str], VerbRegistry]] = None
 
     def is_verb(self, verb: str) -> bool:
         return verb in verbs.VERBS
 
-    def process_verb(self, player: Living, commandstring: str, external_verbs: Optional[AbstractSet[str]] = None) \
+    def suggest_verbs(self, word: str, external_verbs: Optional[ExternalVerbs] = None, amount: int = 3) -> List[str]:
+        """Returns the soul verbs and external verbs that are one typo away from the word, closest first."""
+        if Soul._verb_spell_index is None:
+            Soul._verb_spell_index = SpellIndex(verbs.VERBS)
+        candidates = Soul._verb_spell_index.candidates(word)
+        registry = self.registry_for(external_verbs)
+        if registry.external_verbs():
+            index = registry.index(SpellIndex)
+            candidates = sorted(set(candidates + index.candidates(word)))     # type: ignore
+        return [verb for _, verb in candidates[:amount]]
+
+    def expand_verb_abbreviation(self, prefix: str, external_verbs: Optional[ExternalVerbs] = None,
+                                 amount: int = 5, verb_table: Optional[Mapping[str, Tuple]] = None) -> List[str]:
+        """
+        Returns the soul verbs and external verbs that start with the given prefix (sorted, up to the given amount).
+        A verb that is typed in full is returned as the only result even if it is the prefix of other verbs.
+        Only verbs that are in the verb table (default: the current one) or that are external verbs are returned.
+        """
+        registry = self.registry_for(external_verbs)
+        if verb_table is None:
+            verb_table = verbs.VERBS
+        if prefix in verb_table or prefix in registry:
+            return [prefix]
+        if Soul._verb_prefix_index is None:
+            Soul._verb_prefix_index = PrefixIndex(verbs.VERBS)
+        candidates = [candidate for candidate in Soul._verb_prefix_index.search(prefix)
+                      if candidate in verb_table or registry.is_external(candidate)]
+        if registry.external_verbs():
+            index = registry.index(PrefixIndex)
+            candidates = sorted(set(candidates + index.search(prefix)))     # type: ignore
+        return candidates[:amount]
+
+    def registry_for(self, external_verbs: Optional[ExternalVerbs]) -> VerbRegistry:
+        """
+        The verb registry to parse with. A set of external verbs is registered on top of the soul's
+        verb registry, with priority over the soul verbs (these registries are cached).
+        """
+        if isinstance(external_verbs, VerbRegistry):
+            return external_verbs
+        if not external_verbs:
+            return self.verb_registry
+        last = self._last_external
+        if last and external_verbs is last[0] and (type(external_verbs) is frozenset or external_verbs == last[1]):
+            return last[2]      # the same set again (and unchanged), no need to hash it
+        key = frozenset(external_verbs)
+        registry = self._external_registries.get(key)
+        if registry is None:
+            if len(self._external_registries) >= 16:
+                self._external_registries.clear()   # the set of external verbs usually doesn't vary much
+            registry = self._external_registries[key] = VerbRegistry(self.verb_registry)
+            registry.register("external", key)
+        self._last_external = (external_verbs, key, registry)
+        return registry
+
+    def process_verb(self, player: Living, commandstring: str, external_verbs: Optional[ExternalVerbs] = None) \
         -> Tuple[str, Tuple[AbstractSet[MudObject], str, str, str]]:
         """
         Parse a command string and return a tuple containing the main verb (tickle, ponder, ...)
         and another tuple containing the targets of the action (excluding the player) and the various action messages.
         Any action qualifier is added to the verb string if it is present ("fail kick").
         """
-        parsed = self.parse(player, commandstring, external_verbs or set())
-        if external_verbs and parsed.verb in external_verbs:
+        registry = self.registry_for(external_verbs)
+        parsed = self.parse(player, commandstring, registry)
+        if registry.is_external(parsed.verb):
             raise NonSoulVerbError(parsed)
         result = self.process_verb_parsed(player, parsed)
         if parsed.qualifier:
@@ -177,16 +654,40 @@ class Soul:
         and returns a tuple: (targets-without-player, playermessage, roommessage, targetmessage)
         Target can be a SoulLiving, an Item or an Exit.
         """
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._process_verb_parsed(player, parsed, None)
+        instrumentation.start()
+        try:
+            return self._process_verb_parsed(player, parsed, instrumentation)
+        finally:
+            instrumentation.finish("process", parsed.verb)
+
+    def _process_verb_parsed(self, player: Living, parsed: ParseResult, instrumentation: Optional[Instrumentation]) \
+            -> Tuple[AbstractSet[MudObject], str, str, str]:
+        message = self.verb_message(player, parsed)
+        if instrumentation:
+            instrumentation.lap("template")
+        whof = set(message.targets)
+        whof.discard(player)  # the player should not be part of the remaining targets.
+        result = whof, message.actor_message, message.room_message, message.target_message
+        if instrumentation:
+            instrumentation.lap("render")
+        return result
+
+    def verb_message(self, player: Living, parsed: ParseResult) -> 'VerbMessage':
+        """
+        Like process_verb_parsed, but returns a VerbMessage that renders the message for
+        any observer (the player, one of the targets, or a bystander) only when it is needed.
+        """
         if not player:
             raise TaleError("no player in process_verb_parsed")
         verbdata = verbs.VERBS.get(parsed.verb)
         if not verbdata:
-            raise UnknownVerbError(parsed.verb, [], parsed.qualifier)
+            raise UnknownVerbError(parsed.verb, [], parsed.qualifier, suggest=self.suggest_verbs)
 
         message = parsed.message
         adverb = parsed.adverb
-
-        vtype = verbdata[0]
         if not message and verbdata[1] and len(verbdata[1]) > 1:
             message = verbdata[1][1]  # get the message from the verbs table
         if message:
@@ -203,138 +704,105 @@ class Soul:
                 adverb = verbdata[1][0]  # normal-adverb
             else:
                 adverb = ""
-        where = ""
-        if parsed.bodypart:
-            where = " " + verbs.BODY_PARTS[parsed.bodypart]
-        elif not parsed.bodypart and verbdata[1] and len(verbdata[1]) > 2 and verbdata[1][2]:
-            where = " " + verbdata[1][2]  # replace bodyparts string by specific one from verbs table
+        # note: if no bodypart is given, the template contains the verb's default WHERE already
+        where = " " + verbs.BODY_PARTS[parsed.bodypart] if parsed.bodypart else ""
         how = self.spacify(adverb)
+        template = templates.get(parsed.verb, bool(parsed.who_objects), bool(parsed.bodypart), verbdata)
+        if template.needs_person:
+            raise ParseError(ErrorCode.NEEDS_PERSON, parsed.verb)
 
-        def result_messages(action: str, action_room: str) -> Tuple[AbstractSet[MudObject], str, str, str]:
-            action = action.strip()
-            action_room = action_room.strip()
-            if parsed.qualifier:
-                qual_action, qual_room, use_room_default = verbs.ACTION_QUALIFIERS[parsed.qualifier]
-                action_room = qual_room % action_room if use_room_default else qual_room % action
-                action = qual_action % action
-            # construct message seen by player
-            targetnames = [self.who_replacement(player, target, player) for target in parsed.who_info]
-            player_msg = action.replace(" \nWHO", " " + lang.join(targetnames))
-            player_msg = player_msg.replace(" \nYOUR", " your")
-            player_msg = player_msg.replace(" \nMY", " your")
-            # construct message seen by room
-            targetnames = [self.who_replacement(player, target, None) for target in parsed.who_info]
-            room_msg = action_room.replace(" \nWHO", " " + lang.join(targetnames))
-            room_msg = room_msg.replace(" \nYOUR", " " + player.possessive)
-            room_msg = room_msg.replace(" \nMY", " " + player.objective)
-            # construct message seen by targets
-            target_msg = action_room.replace(" \nWHO", " you")
-            target_msg = target_msg.replace(" \nYOUR", " " + player.possessive)
-            target_msg = target_msg.replace(" \nPOSS", " your")
-            target_msg = target_msg.replace(" \nIS", " are")
-            target_msg = target_msg.replace(" \nSUBJ", " you")
-            target_msg = target_msg.replace(" \nMY", " " + player.objective)
-            # fix up POSS, IS, SUBJ in the player and room messages
-            if parsed.who_count == 1:
-                only_living = parsed.who_1
-                subjective = getattr(only_living, "subjective", "it")  # if no subjective attr, use "it"
-                player_msg = player_msg.replace(" \nIS", " is")
-                player_msg = player_msg.replace(" \nSUBJ", " " + subjective)
-                player_msg = player_msg.replace(" \nPOSS", " " + Soul.poss_replacement(player, only_living, player))
-                room_msg = room_msg.replace(" \nIS", " is")
-                room_msg = room_msg.replace(" \nSUBJ", " " + subjective)
-                room_msg = room_msg.replace(" \nPOSS", " " + Soul.poss_replacement(player, only_living, None))
-            else:
-                targetnames_player = lang.join(
-                    [Soul.poss_replacement(player, living, player) for living in parsed.who_info])
-                targetnames_room = lang.join(
-                    [Soul.poss_replacement(player, living, None) for living in parsed.who_info])
-                player_msg = player_msg.replace(" \nIS", " are")
-                player_msg = player_msg.replace(" \nSUBJ", " they")
-                player_msg = player_msg.replace(" \nPOSS", " " + lang.possessive(targetnames_player))
-                room_msg = room_msg.replace(" \nIS", " are")
-                room_msg = room_msg.replace(" \nSUBJ", " they")
-                room_msg = room_msg.replace(" \nPOSS", " " + lang.possessive(targetnames_room))
-            # add fullstops at the end
-            player_msg = lang.fullstop("You " + player_msg)
-            room_msg = lang.capital(lang.fullstop(player.title + " " + room_msg))
-            target_msg = lang.capital(lang.fullstop(player.title + " " + target_msg))
-            if player in parsed.who_info:
-                who = set(parsed.who_info)
-                who.remove(player)  # the player should not be part of the remaining targets.
-                whof = set(who)
-            else:
-                whof = set(parsed.who_info)
-            return whof, player_msg, room_msg, target_msg
-
-        # construct the action string
-        action = None
-        if vtype == verbs.VerbType.DEUX:
-            action = verbdata[2]
-            action_room = verbdata[3]
-            if not self.check_person(action, parsed):
-                raise ParseError("The verb %s needs a person." % parsed.verb)
-            action = action.replace(" \nWHERE", where)
-            action_room = action_room.replace(" \nWHERE", where)
-            action = action.replace(" \nWHAT", message)
-            action = action.replace(" \nMSG", msg)
-            action_room = action_room.replace(" \nWHAT", message)
-            action_room = action_room.replace(" \nMSG", msg)
-            action = action.replace(" \nHOW", how)
-            action_room = action_room.replace(" \nHOW", how)
-            return result_messages(action, action_room)
-        elif vtype == verbs.VerbType.QUAD:
-            if parsed.who_info:
-                action = verbdata[4]
-                action_room = verbdata[5]
-            else:
-                action = verbdata[2]
-                action_room = verbdata[3]
-            action = action.replace(" \nWHERE", where)
-            action_room = action_room.replace(" \nWHERE", where)
-            action = action.replace(" \nWHAT", message)
-            action = action.replace(" \nMSG", msg)
-            action_room = action_room.replace(" \nWHAT", message)
-            action_room = action_room.replace(" \nMSG", msg)
-            action = action.replace(" \nHOW", how)
-            action_room = action_room.replace(" \nHOW", how)
-            return result_messages(action, action_room)
-        elif vtype == verbs.VerbType.FULL:
-            raise TaleError("vtype verbs.VerbType.FULL")  # doesn't matter, verbs.VerbType.FULL is not used yet anyway
-        elif vtype == verbs.VerbType.DEFA:
-            action = parsed.verb + "$ \nHOW \nAT"
-        elif vtype == verbs.VerbType.PREV:
-            action = parsed.verb + "$" + self.spacify(verbdata[2]) + " \nWHO \nHOW"
-        elif vtype == verbs.VerbType.PHYS:
-            action = parsed.verb + "$" + self.spacify(verbdata[2]) + " \nWHO \nHOW \nWHERE"
-        elif vtype == verbs.VerbType.SHRT:
-            action = parsed.verb + "$" + self.spacify(verbdata[2]) + " \nHOW"
-        elif vtype == verbs.VerbType.PERS:
-            action = verbdata[3] if parsed.who_count else verbdata[2]
-        elif vtype == verbs.VerbType.SIMP:
-            action = verbdata[2]
-        else:
-            raise TaleError("invalid vtype " + vtype)
+        room_template = template.room
+        qual_action = qual_room = "%s"
+        if parsed.qualifier:
+            qual_action, qual_room, use_room_default = verbs.ACTION_QUALIFIERS[parsed.qualifier]
+            if not use_room_default:
+                room_template = template.player
+        values = {"how": how, "where": where, "what": message, "msg": msg,
+                  "your": " " + player.possessive, "my": " " + player.objective}
+        return VerbMessage(self, player, parsed.who_objects, template, room_template, qual_action, qual_room, values)
 
-        if parsed.who_info and len(verbdata) > 3:
-            action = action.replace(" \nAT", self.spacify(verbdata[3]) + " \nWHO")
-        else:
-            action = action.replace(" \nAT", "")
-
-        if not self.check_person(action, parsed):
-            raise ParseError("The verb %s needs a person." % parsed.verb)
-
-        action = action.replace(" \nHOW", how)
-        action = action.replace(" \nWHERE", where)
-        action = action.replace(" \nWHAT", message)
-        action = action.replace(" \nMSG", msg)
-        action_room = action
-        action = action.replace("$", "")
-        action_room = action_room.replace("$", "s")
-        return result_messages(action, action_room)
-
-    def parse(self, player: Living, cmd: str, external_verbs: Optional[AbstractSet[str]] = None) -> ParseResult:
-        """Parse a command string, returns a ParseResult object."""
+    def parse_many(self, commands: Sequence[Tuple[Living, str]], external_verbs: Optional[ExternalVerbs] = None) \
+            -> List[Union[ParseResult, ParseError]]:
+        """
+        Parse a batch of (player, command string) pairs, for instance all commands queued in a single server tick.
+        Players in the same location share the parse scope of that location.
+        Returns a list with, in the same order as the commands, the ParseResult or the ParseError that occurred.
+        (NonSoulVerbError and UnknownVerbError are ParseErrors too, the caller should deal with them as usual)
+        """
+        scopes: Dict[Location, ParseScope] = {}
+        results: List[Union[ParseResult, ParseError]] = []
+        registry = self.registry_for(external_verbs)
+        for player, cmd in commands:
+            scope = scopes.get(player.location)
+            if scope is None:
+                scope = scopes[player.location] = ParseScope(player.location)
+            try:
+                results.append(self.parse(player, cmd, registry, scope=scope))
+            except ParseError as x:
+                results.append(x)
+        return results
+
+    def parse(self, player: Living, cmd: str, external_verbs: Optional[ExternalVerbs] = None, *,
+              scope: Optional[ParseScope] = None) -> ParseResult:
+        """
+        Parse a command string, returns a ParseResult object.
+        The external verbs are a set of the verbs that are handled elsewhere, or a VerbRegistry of all verbs
+        (a registry is faster: a set has to be hashed on every call).
+        Optionally a ParseScope of the player's location can be given to reuse it.
+        """
+        if scope is None or scope.location is not player.location:
+            scope = ParseScope(player.location)
+        registry = self.registry_for(external_verbs)
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._parse_cached(player, cmd, registry, scope, None)
+        instrumentation.start()
+        try:
+            result = self._parse_cached(player, cmd, registry, scope, instrumentation)
+        except NonSoulVerbError as x:
+            instrumentation.finish("parse", x.parsed.verb)
+            raise
+        except ParseError:
+            instrumentation.finish("parse", ERROR_VERB)
+            raise
+        instrumentation.finish("parse", result.verb)
+        return result
+
+    def _parse_cached(self, player: Living, cmd: str, registry: VerbRegistry, scope: ParseScope,
+                      instrumentation: Optional[Instrumentation]) -> ParseResult:
+        if self.parse_cache is None:
+            return self._parse(player, cmd, registry, scope, instrumentation)
+        key = self._parse_cache_key(player, cmd, registry, scope)
+        result = self.parse_cache.get(key)
+        if instrumentation:
+            instrumentation.lap("cache")
+        if result is None:
+            # errors are not cached, they're the uncommon case and their messages can depend on more than the scope
+            result = self._parse(player, cmd, registry, scope, instrumentation)
+            self.parse_cache.put(key, result)
+        elif "'" not in cmd and '"' not in cmd:
+            # the result can be of a command with other whitespace, take the unparsed text from this command instead
+            result.unparsed = _unparsed_text(cmd, len(cmd.split()) - len(result.unparsed.split()))
+        return result
+
+    def _parse_cache_key(self, player: Living, cmd: str, registry: VerbRegistry, scope: ParseScope) -> Hashable:
+        """
+        The key for the parse cache: everything the parse result depends on.
+        Commands that only differ in their whitespace share an entry, unless they contain quoted text (in which
+        the whitespace is kept). The case is not normalised, because the parser is case sensitive.
+        The previous parse only matters if the command contains a pronoun that may refer to it.
+        """
+        words = cmd.split()
+        previous = None
+        if not self._pronouns.isdisjoint(word.rstrip(",") for word in words):
+            history = self.pronoun_history(player)
+            previous = (history, history.version)
+        text = cmd if "'" in cmd or '"' in cmd else " ".join(words)
+        return (text, self.abbreviate_verbs, player, player.inventory_index.version, scope.location, scope.livings.version,
+                scope.items.version, scope.exits.version, registry, registry.version, previous)
+
+    def _parse(self, player: Living, cmd: str, registry: VerbRegistry, scope: ParseScope,
+               instrumentation: Optional[Instrumentation]) -> ParseResult:
         qualifier = ""
         message_verb = False  # does the verb expect a message?
         external_verb = False  # is it a non-soul verb?
@@ -343,84 +811,109 @@ class Soul:
         bodypart = ""
         arg_words: List[str] = []
         unrecognized_words: List[str] = []
-        who_info: MutableMapping[MudObject, ParseResult.WhoInfo] = defaultdict(ParseResult.WhoInfo)
+        result = ParseResult("")    # collects the whos while parsing, the other attributes are set at the end
         who_list: List[MudObject] = []
         who_sequence = 0
-        unparsed = cmd
 
-        # a substring enclosed in quotes will be extracted as the message
-        m = self._quoted_message_regex.search(cmd)
-        if m:
-            message = [(m.group("msg1") or m.group("msg2")).strip()]
-            cmd = cmd[:m.start()] + cmd[m.end():]
+        # the tables are looked up once, if they're reloaded in the meantime this parse still uses the old ones
+        # (the adverb indexes are only needed for unknown words, they're looked up for this adverb table when that happens)
+        verb_table, qualifiers, body_parts, movement_verbs = verbs.VERBS, verbs.ACTION_QUALIFIERS, verbs.BODY_PARTS, verbs.MOVEMENT_VERBS
+        adverb_table = adverbs.ADVERBS
 
-        if not cmd:
-            raise ParseError("What?")
-        words = cmd.split()
-        if words[0] in verbs.ACTION_QUALIFIERS:  # suddenly, fail, ...
+        tokens = lang.tokenize(cmd)
+        quoted = [index for index, token in enumerate(tokens) if token.type is lang.TokenType.QUOTED]
+        if quoted:
+            # the text enclosed in quotes will be extracted as the message (from the first until the last quote)
+            first, last = tokens[quoted[0]], tokens[quoted[-1]]
+            message = [cmd[first.start + 1:last.end - 1].strip()]
+            tokens = tokens[:quoted[0]] + tokens[quoted[-1] + 1:]
+        if instrumentation:
+            instrumentation.lap("tokenize")
+        if not tokens:
+            raise ParseError(ErrorCode.NOTHING)
+        words = [token.text for token in tokens]
+        consumed = 0    # number of words (qualifier, verb...) taken from the front of the words
+
+        def unparsed() -> str:
+            # the original input after the words that have been consumed so far
+            return cmd[tokens[consumed - 1].end:].lstrip() if consumed else cmd
+
+        if words[0] in qualifiers:  # suddenly, fail, ...
             qualifier = words.pop(0)
-            unparsed = unparsed[len(qualifier):].lstrip()
+            consumed += 1
             if qualifier == "dont":
                 qualifier = "don't"  # little spelling suggestion
             # note: don't add qualifier to arg_words
         if words and words[0] in self._skip_words:
-            skipword = words.pop(0)
-            unparsed = unparsed[len(skipword):].lstrip()
+            words.pop(0)
+            consumed += 1
 
         if not words:
-            raise ParseError("What?")
+            raise ParseError(ErrorCode.NOTHING)
         verb = None
-        if words[0] in (external_verbs or {}):  # external verbs have priority above soul verbs
+        if registry.is_external(words[0]):  # the verb set with the highest priority that has the verb isn't the soul
             verb = words.pop(0)
+            consumed += 1
             external_verb = True
             # note: don't add verb to arg_words
-        elif words[0] in verbs.VERBS:
+        elif words[0] in verb_table:
             verb = words.pop(0)
-            verbdata = verbs.VERBS[verb][2]
+            consumed += 1
+            verbdata = verb_table[verb][2]
             message_verb = "\nMSG" in verbdata or "\nWHAT" in verbdata
             # note: don't add verb to arg_words
-        elif player.location.exits:
+        elif scope.exits:
             # check if the words are the name of a room exit.
             move_action = None
-            if words[0] in verbs.MOVEMENT_VERBS:
+            if words[0] in movement_verbs:
                 move_action = words.pop(0)
+                consumed += 1
                 if not words:
-                    raise ParseError("%s where?" % lang.capital(move_action))
-            exit, exit_name, wordcount = self.check_name_with_spaces(words, 0, {}, {}, player.location.exits)
+                    raise ParseError(ErrorCode.MOVE_WHERE, move_action, position=tokens[consumed - 1].start)
+            exit, exit_name, wordcount = scope.exits.match(words, 0)
             if exit:
                 if wordcount != len(words):
-                    raise ParseError("What do you want to do with that?")
-                unparsed = unparsed[len(exit_name or ""):].lstrip()
-                who_info = defaultdict(ParseResult.WhoInfo)
+                    raise ParseError(ErrorCode.EXIT_EXTRA_WORDS, words[wordcount], position=tokens[consumed + wordcount].start)
+                consumed += wordcount
                 raise NonSoulVerbError(
-                    ParseResult(verb=exit_name or "", who_list=[exit], qualifier=qualifier, unparsed=unparsed))
+                    ParseResult(verb=exit_name or "", who_list=[exit], qualifier=qualifier, unparsed=unparsed()))
             elif move_action:
-                raise ParseError("You can't %s there." % move_action)
+                raise ParseError(ErrorCode.CANT_MOVE_THERE, move_action, position=tokens[consumed].start)
             else:
                 # can't determine verb at this point, just continue with verb=None
                 pass
         else:
             # can't determine verb at this point, just continue with verb=None
             pass
+        if not verb and self.abbreviate_verbs and words[0] not in self._not_abbreviations \
+                and words[0] not in body_parts and words[0] not in adverb_table \
+                and not match_longest((scope.livings, player.inventory_index, scope.items), words, 0)[2]:
+            # the word could be an abbreviation of a verb (but only if it isn't a word
+            # that the parser already understands, or the name of something here)
+            candidates = self.expand_verb_abbreviation(words[0], registry, verb_table=verb_table)
+            if len(candidates) > 1:
+                raise AmbiguousVerbError(words[0], words, qualifier, candidates)
+            elif candidates:
+                verb = candidates[0]
+                words.pop(0)
+                consumed += 1
+                if registry.is_external(verb):
+                    external_verb = True
+                else:
+                    verbdata = verb_table[verb][2]
+                    message_verb = "\nMSG" in verbdata or "\nWHAT" in verbdata
 
-        if verb:
-            unparsed = unparsed[len(verb):].lstrip()
+        if instrumentation:
+            instrumentation.lap("verb")
         include_flag = True
         collect_message = False
-        all_livings = {}  # livings in the room (including player) by name + aliases
-        all_items = {}  # all items in the room or player's inventory, by name + aliases
-        for living in player.location.livings:
-            all_livings[living.name] = living
-            for alias in living.aliases:
-                all_livings[alias] = living
-        for item in player.location.items:
-            all_items[item.name] = item
-            for alias in item.aliases:
-                all_items[alias] = item
-        for item in player.inventory:
-            all_items[item.name] = item
-            for alias in item.aliases:
-                all_items[alias] = item
+        # these name indexes are kept up to date by the location and the player, no need to build them here.
+        all_livings = scope.livings  # livings in the room (including player) by name + aliases
+        # when the same name occurs in multiple of these, the first one wins:
+        name_indexes = (all_livings, player.inventory_index, scope.items, scope.exits)
+        name_words = words if message_verb else [word.rstrip(",") for word in words]   # a comma is part of a message
+        if instrumentation:
+            instrumentation.lap("scope")
         previous_word = ""
         words_enumerator = enumerate(words)
         for index, word in words_enumerator:
@@ -431,129 +924,94 @@ class Soul:
                 continue
             if not message_verb and not collect_message:
                 word = word.rstrip(",")
-            if word in ("them", "him", "her", "it"):
-                if self.__previously_parsed:
-                    # try to connect the pronoun to a previously parsed item/living
+                if not word:
+                    continue    # a lone comma
+            if word in self._pronouns:
+                # try to connect the pronoun to a previously parsed item/living
+                if instrumentation:
+                    instrumentation.lap("words")
+                try:
                     prev_who_list = self.match_previously_parsed(player, word)
-                    if prev_who_list:
-                        for who, name in prev_who_list:
-                            if include_flag:
-                                who_info[who].sequence = who_sequence
-                                who_info[who].previous_word = previous_word
-                                who_sequence += 1
-                                who_list.append(who)
-                            else:
-                                del who_info[who]
-                                who_list.remove(who)
-                            arg_words.append(name)  # put the replacement-name in the args instead of the pronoun
-                    previous_word = ""
-                    continue
-                raise ParseError("It is not clear who you mean.")
+                except ParseError as x:
+                    x.position = tokens[consumed + index].start
+                    raise
+                if instrumentation:
+                    instrumentation.lap("pronouns")
+                for who, name in prev_who_list:
+                    if include_flag:
+                        result.add_who(who, who_sequence, previous_word)
+                        who_sequence += 1
+                        who_list.append(who)
+                    else:
+                        if result.remove_who(who):
+                            who_list.remove(who)
+                    arg_words.append(name)  # put the replacement-name in the args instead of the pronoun
+                previous_word = ""
+                continue
             if word in ("me", "myself", "self"):
                 if include_flag:
-                    who_info[player].sequence = who_sequence
-                    who_info[player].previous_word = previous_word
+                    result.add_who(player, who_sequence, previous_word)
                     who_sequence += 1
                     who_list.append(player)
-                elif player in who_info:
-                    del who_info[player]
+                elif result.remove_who(player):
                     who_list.remove(player)
                 arg_words.append(word)
                 previous_word = ""
                 continue
-            if word in verbs.BODY_PARTS:
+            if word in body_parts:
                 if bodypart:
-                    raise ParseError(
-                        "You can't do that both %s and %s." % (verbs.BODY_PARTS[bodypart], verbs.BODY_PARTS[word]))
-                if (word not in all_items and word not in all_livings) or previous_word == "my":
+                    raise ParseError(ErrorCode.BOTH_BODYPARTS, word, other=bodypart, position=tokens[consumed + index].start)
+                if (word not in player.inventory_index and word not in scope.items and word not in all_livings) \
+                        or previous_word == "my":
                     bodypart = word
                     arg_words.append(word)
                     continue
             if word in ("everyone", "everybody", "all"):
                 if include_flag:
                     if not all_livings:
-                        raise ParseError("There is nobody here.")
+                        raise ParseError(ErrorCode.NOBODY_HERE, word, position=tokens[consumed + index].start)
                     # include every *living* thing visible, don't include items, and skip the player itself
-                    for living in player.location.livings:
+                    for living in scope.location.livings:
                         if living is not player:
-                            who_info[living].sequence = who_sequence
-                            who_info[living].previous_word = previous_word
+                            result.add_who(living, who_sequence, previous_word)
                             who_sequence += 1
                             who_list.append(living)
                 else:
-                    who_info.clear()
+                    result.clear_who()
                     who_list.clear()
                     who_sequence = 0
                 arg_words.append(word)
                 previous_word = ""
                 continue
             if word == "everything":
-                raise ParseError("You can't do something to everything around you, be more specific.")
+                raise ParseError(ErrorCode.EVERYTHING, word, position=tokens[consumed + index].start)
             if word in ("except", "but"):
                 include_flag = not include_flag
                 arg_words.append(word)
                 continue
-            if word in adverbs.ADVERBS:
+            if word in adverb_table:
                 if adverb:
-                    raise ParseError("You can't do that both %s and %s." % (adverb, word))
+                    raise ParseError(ErrorCode.BOTH_ADVERBS, word, other=adverb, position=tokens[consumed + index].start)
                 adverb = word
                 arg_words.append(word)
                 continue
-            if word in all_livings:
-                living = all_livings[word]
-                if include_flag:
-                    who_info[living].sequence = who_sequence
-                    who_info[living].previous_word = previous_word
-                    who_sequence += 1
-                    who_list.append(living)
-                elif living in who_info:
-                    del who_info[living]
-                    who_list.remove(living)
-                arg_words.append(word)
-                previous_word = ""
-                continue
-            if word in all_items:
-                item = all_items[word]
-                if include_flag:
-                    who_info[item].sequence = who_sequence
-                    who_info[item].previous_word = previous_word
-                    who_sequence += 1
-                    who_list.append(item)
-                elif item in who_info:
-                    del who_info[item]
-                    who_list.remove(item)
-                arg_words.append(word)
-                previous_word = ""
-                continue
-            if player.location:
-                exit, exit_name, wordcount = self.check_name_with_spaces(words, index, {}, {}, player.location.exits)
-                if exit:
-                    who_info[exit].sequence = who_sequence
-                    who_info[exit].previous_word = previous_word
-                    previous_word = ""
-                    who_sequence += 1
-                    who_list.append(exit)
-                    if exit_name:
-                        arg_words.append(exit_name)
-                    while wordcount > 1:
-                        next(words_enumerator)
-                        wordcount -= 1
-                    continue
-            item_or_living, full_name, wordcount = self.check_name_with_spaces(words, index, all_livings, all_items, {})
-            if item_or_living:
+            # find the longest (multi-word) name of a living, item or exit that starts with this word
+            if instrumentation:
+                instrumentation.lap("words")
+            who, name, wordcount = match_longest(name_indexes, name_words, index)
+            if instrumentation:
+                instrumentation.lap("names")
+            if who:
                 while wordcount > 1:
                     next(words_enumerator)
                     wordcount -= 1
                 if include_flag:
-                    who_info[item_or_living].sequence = who_sequence
-                    who_info[item_or_living].previous_word = previous_word
+                    result.add_who(who, who_sequence, previous_word)
                     who_sequence += 1
-                    who_list.append(item_or_living)
-                elif item_or_living in who_info:
-                    del who_info[item_or_living]
-                    who_list.remove(item_or_living)
-                if full_name:
-                    arg_words.append(full_name)
+                    who_list.append(who)
+                elif result.remove_who(who):
+                    who_list.remove(who)
+                arg_words.append(name)
                 previous_word = ""
                 continue
             if message_verb and not message:
@@ -564,43 +1022,47 @@ class Soul:
             if word not in self._skip_words:
                 # unrecognized word, check if it could be a person's name or an item. (prefix)
                 if not who_list:
-                    for name in all_livings:
-                        if name.startswith(word):
-                            raise ParseError("Perhaps you meant %s?" % name)
-                    for name in all_items:
-                        if name.startswith(word):
-                            raise ParseError("Perhaps you meant %s?" % name)
+                    suggestions = all_livings.search_prefix(word, 3) or search_prefix((player.inventory_index, scope.items), word, 3)
+                    if suggestions:
+                        raise ParseError(ErrorCode.NAME_PREFIX, word, suggestions, position=tokens[consumed + index].start)
                 if not external_verb:
                     if not verb:
-                        raise UnknownVerbError(word, words, qualifier)
+                        raise UnknownVerbError(word, words, qualifier, registry=registry, suggest=self.suggest_verbs)
                     # check if it is a prefix of an adverb, if so, suggest a few adverbs
-                    prefixed_adverbs = adverbs.search_prefix(word)
+                    if instrumentation:
+                        instrumentation.lap("words")
+                    prefixed_adverbs = adverbs.prefix_index(adverb_table).search(word, 5)
+                    if instrumentation:
+                        instrumentation.lap("adverb prefix")
                     if len(prefixed_adverbs) == 1:
                         word = prefixed_adverbs[0]
                         if adverb:
-                            raise ParseError("You can't do that both %s and %s." % (adverb, word))
+                            raise ParseError(ErrorCode.BOTH_ADVERBS, word, other=adverb, position=tokens[consumed + index].start)
                         adverb = word
                         arg_words.append(word)
                         previous_word = word
                         continue
                     elif len(prefixed_adverbs) > 1:
-                        raise ParseError("What adverb did you mean: %s?" % lang.join(prefixed_adverbs, conj="or"))
+                        raise ParseError(ErrorCode.ADVERB_PREFIX, word, prefixed_adverbs, position=tokens[consumed + index].start)
 
                 if external_verb:
                     arg_words.append(word)
                     unrecognized_words.append(word)
                 else:
-                    if word in verbs.VERBS or word in verbs.ACTION_QUALIFIERS or word in verbs.BODY_PARTS:
+                    if word in verb_table or word in qualifiers or word in body_parts:
                         # in case of a misplaced verb, qualifier or bodypart give a little more specific error
-                        raise ParseError("The word %s makes no sense at that location." % word)
+                        raise ParseError(ErrorCode.MISPLACED_WORD, word, position=tokens[consumed + index].start)
                     else:
+                        # maybe it's a misspelled adverb
+                        suggestions = adverbs.spell_index(adverb_table).suggest(word, 3)
+                        if suggestions:
+                            raise ParseError(ErrorCode.ADVERB_TYPO, word, suggestions, position=tokens[consumed + index].start)
                         # no idea what the user typed, generic error
-                        errormsg = "It's not clear what you mean by '%s'." % word
-                        if word[0].isupper():
-                            errormsg += " Just type in lowercase ('%s')." % word.lower()
-                        raise ParseError(errormsg)
+                        raise ParseError(ErrorCode.UNCLEAR_WORD, word, position=tokens[consumed + index].start)
             previous_word = word
 
+        if instrumentation:
+            instrumentation.lap("words")
         message_text = " ".join(message)
         if not verb:
             # This is interesting: there's no verb.
@@ -609,13 +1071,33 @@ class Soul:
             if len(who_list) == 1:
                 verb = getattr(who_list[0], "default_verb", "examine")
             else:
-                raise UnknownVerbError(words[0], words, qualifier)
-        return ParseResult(verb or "", who_info=who_info, who_list=who_list,
-                           adverb=adverb, message=message_text, bodypart=bodypart, qualifier=qualifier,
-                           args=arg_words, unrecognized=unrecognized_words, unparsed=unparsed)
+                raise UnknownVerbError(words[0], words, qualifier, registry=registry, suggest=self.suggest_verbs)
+        result.verb = verb or ""
+        result.adverb = adverb
+        result.message = message_text
+        result.bodypart = bodypart
+        result.qualifier = qualifier
+        result.args = arg_words
+        result.unrecognized = unrecognized_words
+        result.unparsed = unparsed()
+        return result
+
+    def remember_previous_parse(self, parsed: ParseResult, player: Optional[Living] = None) -> None:
+        """
+        Remember the objects referred to in the parse result, for the pronouns in the player's next commands.
+        Without a player, they're remembered in the history that is shared by all players that don't have their own.
+        """
+        history: Optional[PronounHistory]
+        if player is None:
+            history = self._shared_pronoun_history
+        else:
+            history = self._pronoun_histories.get(player)
+            if history is None:
+                history = self._pronoun_histories[player] = PronounHistory(self.pronoun_history_size)
+        history.remember(parsed.who_objects)
 
-    def remember_previous_parse(self, parsed: ParseResult) -> None:
-        self.__previously_parsed = parsed
+    def pronoun_history(self, player: Living) -> PronounHistory:
+        return self._pronoun_histories.get(player, self._shared_pronoun_history)
 
     def match_previously_parsed(self, player: Living, pronoun: str) -> List[Tuple[MudObject, str]]:
         """
@@ -624,31 +1106,43 @@ class Soul:
         The reason we return a replacement-name is that the parser can replace the
         pronoun by the proper name that would otherwise have been used in that place.
         """
-        if pronoun == "them":
-            # plural (any item/living qualifies)
-            matches = list(self.__previously_parsed.who_info)
-            for who in matches:
-                if not player.search_item(who.name) and who not in player.location.livings:
-                    raise ParseError("%s is no longer around." % lang.capital(who.subjective))
-            if matches:
-                return [(who, who.name) for who in matches]
-            else:
-                raise ParseError("It is not clear who or what you're referring to.")
-        for who in self.__previously_parsed.who_info:
-            # first see if it is an exit
-            if pronoun == "it":
-                for direction, exit in player.location.exits.items():
-                    if exit is who:
-                        return [(who, direction)]
-            # not an exit, try an item or a living
-            if pronoun == who.objective:
-                if player.search_item(who.name) or who in player.location.livings:
-                    return [(who, who.name)]
-                raise ParseError("%s is no longer around." % lang.capital(who.subjective))
-        raise ParseError("It is not clear who or what you're referring to.")
+        history = self.pronoun_history(player)
+        referents = history.lookup(pronoun)
+        if not referents:
+            raise ParseError(ErrorCode.UNCLEAR_PRONOUN, pronoun)
+        location = player.location
+        # the objects only need to be looked up again if something moved since they were last found
+        scope = (location, location.livings.index.version, location.items.index.version,
+                 location.exits.version, player.inventory_index.version)
+        verify = history.verified.get(pronoun) != scope
+        matches = []
+        for referent in referents:
+            who = referent.ref()
+            if who is None or (verify and not self._is_around(player, who)):
+                raise ParseError(ErrorCode.NO_LONGER_AROUND, referent.subjective, other=pronoun)
+            matches.append((who, self._direction(location, who) or who.name))
+        history.verified[pronoun] = scope
+        return matches
 
     @staticmethod
-    def poss_replacement(actor: Living, target: Optional[MudObject], observer: Optional[Living]) -> str:
+    def _is_around(player: Living, who: MudObject) -> bool:
+        location = player.location
+        return who in location.livings or who in location.items or player.inventory_index.contains_object(who) \
+            or Soul._direction(location, who) != ""
+
+    @staticmethod
+    def _direction(location: Location, who: MudObject) -> str:
+        """the direction of the exit in the location, or an empty string if it isn't an exit there"""
+        if location.exits.get(who.name) is who:
+            return who.name
+        if isinstance(who, Exit):
+            for direction, exit in location.exits.items():
+                if exit is who:
+                    return direction
+        return ""
+
+    @staticmethod
+    def poss_replacement(actor: Living, target: Optional[MudObject], observer: Optional[MudObject]) -> str:
         """determines what word to use for a POSS"""
         if target is actor:
             if actor is observer:
@@ -667,7 +1161,7 @@ class Soul:
         """returns string prefixed with a space, if it has contents. If it is empty, prefix nothing"""
         return " " + string.lstrip(" \t") if string else ""
 
-    def who_replacement(self, actor: Living, target: MudObject, observer: Optional[Living]) -> str:
+    def who_replacement(self, actor: Living, target: MudObject, observer: Optional[MudObject]) -> str:
         """determines what word to use for a WHO"""
         if target is actor:
             if actor is observer:
@@ -681,7 +1175,7 @@ class Soul:
                 return target.title  # ... kicks ...
 
     def check_person(self, action: str, parsed: ParseResult) -> bool:
-        if not parsed.who_info and ("\nWHO" in action or "\nPOSS" in action):
+        if not parsed.who_objects and ("\nWHO" in action or "\nPOSS" in action):
             return False
         return True
 
@@ -692,23 +1186,25 @@ class Soul:
         Searches for a name used in sentence where the name consists of multiple words (separated by space).
         You provide the sequence of words that forms the sentence and the startindex of the first word
         to start searching.
-        Searching is done in the livings, items, and exits dictionaries, in that order.
-        The name being searched for is gradually extended with more words until a match is found.
+        Searching is done in the livings, items, and exits dictionaries, and the longest name that matches is used.
+        If names of equal length are found, livings take precedence over items, and items over exits.
         The return tuple is (matched_object, matched_name, number of words used in match).
-        If nothing is found, a tuple (None, None, 0) is returned.
+        If nothing is found, a tuple (None, "", 0) is returned.
         """
-        wordcount = 1
-        name = words[startindex]
-        try:
-            while wordcount < 6:  # an upper bound for the number of words to concatenate to avoid long runtime
-                if name in all_livings:
-                    return all_livings[name], name, wordcount
-                if name in all_items:
-                    return all_items[name], name, wordcount
-                if name in all_exits:
-                    return all_exits[name], name, wordcount
-                name = name + " " + words[startindex + wordcount]
-                wordcount += 1
-        except IndexError:
-            pass
+        indexes = [mapping if isinstance(mapping, (NameIndex, NameMap)) else _MappingTrie(mapping)
+                   for mapping in (all_livings, all_items, all_exits)]
+        return match_longest(indexes, words, startindex)
+
+
+class _MappingTrie:
+    """adapter to search the names in a regular mapping with a word trie"""
+
+    def __init__(self, mapping: Mapping[str, MudObject]) -> None:
+        self.mapping = mapping
+        self.trie = WordTrie(mapping)
+
+    def match(self, words: Sequence[str], start: int) -> Tuple[Optional[MudObject], str, int]:
+        name, wordcount = self.trie.match(words, start)
+        if wordcount:
+            return self.mapping[name], name, wordcount
         return None, "", 0
@@ -0,0 +1,112 @@
+"""
+Registry of the verbs that the parser recognises.
+
+Besides the soul verbs, a game has driver commands, zone specific verbs, and so on.
+These are registered as named verb sets with a priority, and merged into a single map
+of verb -> set, that is only rebuilt when the registry changes.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple, Union
+from . import verbs
+from ..textindex import PrefixIndex, SpellIndex
+
+
+SOUL = "soul"   # the name of the set of soul verbs, that has priority 0
+
+
+class VerbRegistry:
+    """
+    The soul verbs plus named sets of other (non-soul) verbs, each with a priority.
+    When a verb occurs in multiple sets, the set with the highest priority handles it
+    (on equal priorities, the set that was registered last).
+    A registry can have a parent, such as a zone's registry on top of the registry of the whole game:
+    it then also contains the verb sets of the parent, and follows the changes that are made to those.
+    The version increases with every change (also of the parent), so caches can key on (registry, version).
+    The soul verbs follow a reload of the verb table (see tables.reload).
+    """
+
+    def __init__(self, parent: Optional['VerbRegistry'] = None) -> None:
+        self.parent = parent
+        self._sets: Dict[str, Tuple[int, FrozenSet[str]]] = {}   # name -> (priority, verbs)
+        self._soul_verbs = verbs.VERBS
+        if not parent:
+            self._sets[SOUL] = (0, frozenset(self._soul_verbs))
+        self._changes = 0
+        self._built_version = -1
+        self._dispatch: Dict[str, str] = {}
+        self._external: FrozenSet[str] = frozenset()
+        self._indexes: Dict[type, Union[PrefixIndex, SpellIndex]] = {}
+
+    @property
+    def version(self) -> int:
+        if self.parent:
+            return self._changes + self.parent.version
+        if verbs.VERBS is not self._soul_verbs and SOUL in self._sets:
+            # the verb table has been reloaded, follow it
+            self._soul_verbs = verbs.VERBS
+            self._sets[SOUL] = (self._sets[SOUL][0], frozenset(self._soul_verbs))
+            self._changes += 1
+        return self._changes
+
+    def register(self, name: str, verb_set: Iterable[str], priority: int = 1) -> None:
+        """Adds the set of verbs under the given name (replacing the set that had that name)."""
+        self._sets.pop(name, None)
+        self._sets[name] = (priority, frozenset(verb_set))
+        self._changes += 1
+
+    def unregister(self, name: str) -> None:
+        if self._sets.pop(name, None):
+            self._changes += 1
+
+    def verb_sets(self) -> Dict[str, Tuple[int, FrozenSet[str]]]:
+        """name -> (priority, verbs) of all verb sets, including those of the parent"""
+        sets = self.parent.verb_sets() if self.parent else {}
+        for name, verb_set in self._sets.items():
+            sets.pop(name, None)
+            sets[name] = verb_set
+        return sets
+
+    def _build(self) -> Dict[str, str]:
+        """the map of verb -> name of the set that handles it, rebuilt if the registry changed"""
+        version = self.version
+        if version != self._built_version:
+            dispatch: Dict[str, str] = {}
+            # the sort is stable, so on equal priorities the set that was registered later overwrites the others
+            for name, (_, verb_set) in sorted(self.verb_sets().items(), key=lambda item: item[1][0]):
+                dispatch.update(dict.fromkeys(verb_set, name))
+            self._dispatch = dispatch
+            self._external = frozenset(verb for verb, name in dispatch.items() if name != SOUL)
+            self._indexes.clear()
+            self._built_version = version
+        return self._dispatch
+
+    def __contains__(self, verb: object) -> bool:
+        return verb in self._build()
+
+    def __len__(self) -> int:
+        return len(self._build())
+
+    def lookup(self, verb: str) -> Optional[str]:
+        """the name of the verb set that handles the verb, or None if it's not a known verb"""
+        return self._build().get(verb)
+
+    def is_external(self, verb: str) -> bool:
+        """is it a verb that is handled by something else than the soul?"""
+        name = self._build().get(verb)
+        return name is not None and name != SOUL
+
+    def external_verbs(self) -> FrozenSet[str]:
+        """all verbs that are handled by something else than the soul"""
+        self._build()
+        return self._external
+
+    def index(self, index_type: type) -> Union[PrefixIndex, SpellIndex]:
+        """the PrefixIndex or SpellIndex of the external verbs, built on first use"""
+        external = self.external_verbs()
+        index = self._indexes.get(index_type)
+        if index is None:
+            index = self._indexes[index_type] = index_type(external)
+        return index
@@ -0,0 +1,284 @@
+"""
+Compiled soul tables, for a faster startup of (worker) processes.
+
+The verb and adverb tables themselves are Python literals that are loaded quickly from the bytecode cache,
+but the structures derived from them (the compiled message templates and the prefix and spelling indexes
+of the verbs and adverbs) take a lot longer to build. A build step stores those in a binary file:
+
+    python -m tale_ng.soul [path]
+
+When the first Soul is created, that file is memory mapped and loaded if it exists.
+It contains plain data in the marshal format (like the bytecode cache), from which the objects are restored.
+It is only used if it was built from the same tables, format version and Python version,
+otherwise the soul simply builds everything from the Python sources on first use, as usual.
+The environment variable TALE_NG_SOUL_TABLES can point to another file, or be empty to not load any.
+
+Alternatively, a server that forks worker processes can call share() before forking. That replaces the verb
+and adverb tables and their indexes by read-only tables in a memory mapped file (see the sharedtable module),
+so that all workers share a single physical copy of them, instead of each getting its own copy as soon as
+the reference counts of the objects in the tables are touched. Lookups in those tables are a bit slower.
+
+The tables can also be reloaded from their (edited) source files without restarting the game: reload()
+builds the new tables and everything derived from them (in a background thread, if you want) and then swaps
+them in at once. A parse that is in progress finishes with the tables it started with. Changes to the code
+of the soul itself (such as a new verb type) still require a restart.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import hashlib
+import importlib.util
+import marshal
+import mmap
+import os
+import sys
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Sequence, Tuple, Type, TypeVar, TYPE_CHECKING
+from . import verbs, adverbs, templates
+from .parse import Soul
+from ..textindex import PrefixIndex, SpellIndex
+from ..errors import TaleError
+
+if TYPE_CHECKING:
+    import threading    # the threading, argparse and sharedtable modules are only imported when they're needed
+
+
+FORMAT_VERSION = 1     # increase this when the structure of the compiled tables changes
+MAGIC = b"TALESOUL"
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "soul_tables.bin")
+DEFAULT_SHARED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "soul_tables.shared")
+
+
+def fingerprint() -> bytes:
+    """Identifies the tables (and the format version) that a compiled file has been built from."""
+    digest = hashlib.sha1(("%d %s %s" % (FORMAT_VERSION, sys.implementation.cache_tag, sys.byteorder)).encode("ascii"))
+    digest.update(repr(sorted(verbs.VERBS.items())).encode("utf-8"))
+    digest.update(repr(list(adverbs.ALPHABETICALLY)).encode("utf-8"))
+    return digest.hexdigest().encode("ascii")
+
+
+def compile_tables(verb_table: Optional[Mapping[str, Tuple]] = None, adverb_set: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Builds all of the structures that are derived from the tables (by default, the ones in use)."""
+    verb_table = verbs.VERBS if verb_table is None else verb_table
+    adverb_set = adverbs.ADVERBS if adverb_set is None else adverb_set
+    compiled = {}
+    for verb, verbdata in verb_table.items():
+        for with_targets in (False, True):
+            for with_bodypart in (False, True):
+                try:
+                    compiled[verb, with_targets, with_bodypart] = templates.compile_verb(verb, verbdata, with_targets, with_bodypart)
+                except TaleError:
+                    pass    # a verb type that has no templates
+    return {
+        "templates": compiled,
+        "adverb_prefix_index": PrefixIndex(adverb_set),
+        "adverb_spell_index": SpellIndex(adverb_set, max_distance=1),
+        "verb_prefix_index": PrefixIndex(verb_table),
+        "verb_spell_index": SpellIndex(verb_table),
+    }
+
+
+def _to_data(tables: Dict[str, Any]) -> Dict[str, Any]:
+    """converts the compiled tables to plain data that can be marshaled"""
+    data = {name: vars(index) for name, index in tables.items() if name != "templates"}
+    data["templates"] = [(key, template.vtype.name, template.player, template.room, template.needs_person)
+                         for key, template in tables["templates"].items()]
+    return data
+
+
+IndexType = TypeVar("IndexType", PrefixIndex, SpellIndex)
+
+
+def _restore(index_type: Type[IndexType], attributes: Dict[str, Any]) -> IndexType:
+    index = index_type.__new__(index_type)
+    index.__dict__.update(attributes)
+    return index
+
+
+def _from_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "templates": {key: templates.VerbTemplate(verbs.VerbType[vtype], player, room, needs_person)
+                      for key, vtype, player, room, needs_person in data["templates"]},
+        "adverb_prefix_index": _restore(PrefixIndex, data["adverb_prefix_index"]),
+        "adverb_spell_index": _restore(SpellIndex, data["adverb_spell_index"]),
+        "verb_prefix_index": _restore(PrefixIndex, data["verb_prefix_index"]),
+        "verb_spell_index": _restore(SpellIndex, data["verb_spell_index"]),
+    }
+
+
+def build(path: str = DEFAULT_PATH) -> None:
+    """Compiles the tables and writes them to the file (atomically, processes may be loading it at the same time)."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + fingerprint())
+        marshal.dump(_to_data(compile_tables()), file)
+    os.replace(temp_path, path)
+
+
+def read(path: str = DEFAULT_PATH) -> Optional[Dict[str, Any]]:
+    """Reads the compiled tables from the file. Returns None if it doesn't exist, or is outdated or unreadable."""
+    header = MAGIC + fingerprint()
+    try:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view, view[len(header):] as body:
+                if view[:len(header)] != header:
+                    return None
+                data = marshal.loads(body)
+        return _from_data(data)
+    except Exception:
+        return None     # whatever is wrong with the file, the tables can still be built from the sources
+
+
+def install(tables: Dict[str, Any]) -> None:
+    """Puts the compiled tables in place of the ones that are otherwise built on first use."""
+    Soul._tables_loaded = True
+    templates._compiled.update(tables["templates"])
+    adverbs._prefix_index = tables["adverb_prefix_index"]
+    adverbs._spell_index = tables["adverb_spell_index"]
+    Soul._verb_prefix_index = tables["verb_prefix_index"]
+    Soul._verb_spell_index = tables["verb_spell_index"]
+
+
+def load(path: Optional[str] = None) -> bool:
+    """
+    Loads and installs the compiled tables, if they're available and up to date. Returns whether they were.
+    Without a path, the file from the TALE_NG_SOUL_TABLES environment variable or the default file is used.
+    """
+    if path is None:
+        path = os.environ.get("TALE_NG_SOUL_TABLES", DEFAULT_PATH)
+    if not path or not os.path.exists(path):
+        return False
+    tables = read(path)
+    if tables is None:
+        return False
+    install(tables)
+    return True
+
+
+def _encode_verb(verbdata: Tuple) -> Tuple:
+    return (verbdata[0].name,) + verbdata[1:]
+
+
+def _decode_verb(verbdata: Tuple) -> Tuple:
+    return (verbs.VerbType[verbdata[0]],) + verbdata[1:]
+
+
+def build_shared(path: str = DEFAULT_SHARED_PATH) -> None:
+    """Writes the tables and their indexes to a file for share()."""
+    from ..sharedtable import encode_table, write_tables
+    compiled = compile_tables()
+    write_tables(path, MAGIC + fingerprint(), {
+        "verbs": encode_table(verbs.VERBS, _encode_verb),
+        "adverbs": encode_table(dict.fromkeys(adverbs.ADVERBS)),
+        "verb_prefixes": encode_table(compiled["verb_prefix_index"]._ranges),
+        "verb_deletes": encode_table(compiled["verb_spell_index"]._deletes),
+        "adverb_prefixes": encode_table(compiled["adverb_prefix_index"]._ranges),
+        "adverb_deletes": encode_table(compiled["adverb_spell_index"]._deletes),
+    })
+
+
+def share(path: str = DEFAULT_SHARED_PATH) -> None:
+    """
+    Replaces the verb and adverb tables and their indexes by read-only tables in the memory mapped file
+    (which is built first, if it doesn't exist or is outdated). Call this before forking the worker processes.
+    """
+    from ..sharedtable import SortedKeys, open_tables
+    Soul._tables_loaded = True     # the compiled tables must not replace the shared ones later
+    header = MAGIC + fingerprint()
+    shared = open_tables(path, header, {"verbs": _decode_verb}) if os.path.exists(path) else None
+    if shared is None:
+        build_shared(path)
+        shared = open_tables(path, header, {"verbs": _decode_verb})
+        if shared is None:
+            raise TaleError("can't share the soul tables, the file %s is invalid" % path)
+    verbs.VERBS = shared["verbs"]    # type: ignore
+    adverbs.ADVERBS = shared["adverbs"].keys()     # type: ignore
+    adverbs.ALPHABETICALLY = SortedKeys(shared["adverbs"])     # type: ignore
+    Soul._verb_prefix_index = _restore(PrefixIndex, {"words": SortedKeys(shared["verbs"]), "_ranges": shared["verb_prefixes"]})
+    Soul._verb_spell_index = _restore(SpellIndex, {"max_distance": 1, "_deletes": shared["verb_deletes"]})
+    adverbs._prefix_index = _restore(PrefixIndex, {"words": adverbs.ALPHABETICALLY, "_ranges": shared["adverb_prefixes"]})
+    adverbs._spell_index = _restore(SpellIndex, {"max_distance": 1, "_deletes": shared["adverb_deletes"]})
+
+
+VERB_TABLES = ("AGGRESSIVE_VERBS", "NONLIVING_OK_VERBS", "MOVEMENT_VERBS", "ACTION_QUALIFIERS", "NEGATING_QUALIFIERS",
+               "BODY_PARTS", "VERBS")
+ADVERB_TABLES = ("ADVERBS", "ALPHABETICALLY")
+
+
+def _load_source(module: ModuleType) -> ModuleType:
+    """Executes the source file of the module as a new, separate module. The module itself is left alone."""
+    spec = importlib.util.spec_from_file_location(module.__name__ + "_reloaded", module.__file__ or "")
+    if spec is None or spec.loader is None:
+        raise TaleError("can't load the source of module %s" % module.__name__)
+    new_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(new_module)
+    return new_module
+
+
+def prepare_reload() -> Dict[str, Any]:
+    """
+    Loads the verb and adverb tables from their source files and builds everything that is derived from them,
+    without touching the tables that are in use. This takes a while, so it can be done in a background thread.
+    Errors in the sources (including the consistency checks in them) are raised here. The result is for swap().
+    """
+    new_verbs = _load_source(verbs)
+    new_adverbs = _load_source(adverbs)
+    prepared = {name: getattr(new_verbs, name) for name in VERB_TABLES}
+    prepared.update((name, getattr(new_adverbs, name)) for name in ADVERB_TABLES)
+    # the new module has an enum of its own, the verb types have to be the ones that the soul uses
+    prepared["VERBS"] = {verb: (verbs.VerbType[verbdata[0].name],) + verbdata[1:] for verb, verbdata in new_verbs.VERBS.items()}
+    prepared.update(compile_tables(prepared["VERBS"], prepared["ADVERBS"]))
+    return prepared
+
+
+def swap(prepared: Dict[str, Any]) -> None:
+    """
+    Puts the prepared tables in use. This only replaces a few references so it's fast enough to do under load.
+    The old tables are not modified, so a parse that is in progress can finish with them.
+    """
+    Soul._tables_loaded = True
+    templates._compiled = dict(prepared["templates"])
+    adverbs._prefix_index = prepared["adverb_prefix_index"]
+    adverbs._spell_index = prepared["adverb_spell_index"]
+    Soul._verb_prefix_index = prepared["verb_prefix_index"]
+    Soul._verb_spell_index = prepared["verb_spell_index"]
+    for name in ADVERB_TABLES:
+        setattr(adverbs, name, prepared[name])
+    for name in VERB_TABLES:
+        setattr(verbs, name, prepared[name])    # the verb table is the last one, the verb registries follow it
+
+
+def reload(background: bool = False, done: Optional[Callable[[Optional[Exception]], None]] = None) -> Optional['threading.Thread']:
+    """
+    Reloads the verb and adverb tables from their source files. Without background, it's done right away
+    (and errors are raised). Otherwise, the new tables are prepared in a daemon thread, that is returned;
+    it swaps them in when they're ready and then calls done(None), or done(error) if the sources had an error.
+    """
+    if not background:
+        swap(prepare_reload())
+        return None
+    import threading
+
+    def reload_tables() -> None:
+        try:
+            swap(prepare_reload())
+        except Exception as x:
+            if done:
+                done(x)
+            return
+        if done:
+            done(None)
+
+    thread = threading.Thread(target=reload_tables, name="soul tables reload", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(args: Optional[Sequence[str]] = None) -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile the soul's verb and adverb tables into a binary file.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, help="the file to write (default: %(default)s)")
+    options = parser.parse_args(args)
+    build(options.path)
+    print("compiled soul tables written to", options.path)
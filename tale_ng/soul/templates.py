@@ -0,0 +1,108 @@
+"""
+Precompiled message templates for the soul verbs.
+
+The verb table contains action strings with escapes such as \\nHOW, \\nWHO and $.
+Instead of replacing these escapes one by one for every emote, each verb is
+compiled (once, lazily) into %-style format strings that only need their slots filled.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+from . import verbs
+from ..errors import TaleError
+
+
+# the escapes that get a value when rendering a message. (AT is resolved when compiling)
+_slot_regex = re.compile(r" \n(HOW|IS|MSG|MY|POSS|SUBJ|WHAT|WHERE|WHO|YOUR)")
+_format_slot_regex = re.compile(r"%\((\w+)\)s")
+
+
+class VerbTemplate:
+    """
+    The compiled message templates of a single verb.
+    'player' and 'room' are format strings that take a mapping with the (lowercase) slot names
+    how, where, what, msg, who, your, my, poss, is, subj.
+    'slots' is the set of slot names that actually occur in the templates.
+    """
+    __slots__ = ("vtype", "player", "room", "needs_person", "slots")
+
+    def __init__(self, vtype: verbs.VerbType, player: str, room: str, needs_person: bool) -> None:
+        self.vtype = vtype
+        self.player = player
+        self.room = room
+        self.needs_person = needs_person
+        self.slots = frozenset(_format_slot_regex.findall(player + room))
+
+
+def _format_string(action: str, default_where: str) -> str:
+    """converts an action string with escapes into a format string with named slots"""
+    if default_where:
+        action = action.replace(" \nWHERE", default_where)
+    return _slot_regex.sub(lambda m: "%(" + m.group(1).lower() + ")s", action.replace("%", "%%"))
+
+
+def _spacify(string: str) -> str:
+    return " " + string.lstrip(" \t") if string else ""
+
+
+def compile_verb(verb: str, verbdata: Tuple, with_targets: bool, with_bodypart: bool) -> VerbTemplate:
+    """
+    Compiles the action strings of a verb into a VerbTemplate.
+    The result differs depending on whether the action has targets (who) or not,
+    and whether a bodypart is given (otherwise the verb's default WHERE is compiled into the template).
+    """
+    vtype = verbdata[0]
+    default_where = ""
+    if not with_bodypart and verbdata[1] and len(verbdata[1]) > 2 and verbdata[1][2]:
+        default_where = " " + verbdata[1][2]   # replace bodyparts string by specific one from verbs table
+    if vtype == verbs.VerbType.DEUX:
+        needs_person = "\nWHO" in verbdata[2] or "\nPOSS" in verbdata[2]
+        return VerbTemplate(vtype, _format_string(verbdata[2], default_where), _format_string(verbdata[3], default_where),
+                            needs_person and not with_targets)
+    elif vtype == verbs.VerbType.QUAD:
+        if with_targets:
+            return VerbTemplate(vtype, _format_string(verbdata[4], default_where), _format_string(verbdata[5], default_where), False)
+        return VerbTemplate(vtype, _format_string(verbdata[2], default_where), _format_string(verbdata[3], default_where), False)
+    elif vtype == verbs.VerbType.FULL:
+        raise TaleError("vtype verbs.VerbType.FULL")  # doesn't matter, verbs.VerbType.FULL is not used yet anyway
+    elif vtype == verbs.VerbType.DEFA:
+        action = verb + "$ \nHOW \nAT"
+    elif vtype == verbs.VerbType.PREV:
+        action = verb + "$" + _spacify(verbdata[2]) + " \nWHO \nHOW"
+    elif vtype == verbs.VerbType.PHYS:
+        action = verb + "$" + _spacify(verbdata[2]) + " \nWHO \nHOW \nWHERE"
+    elif vtype == verbs.VerbType.SHRT:
+        action = verb + "$" + _spacify(verbdata[2]) + " \nHOW"
+    elif vtype == verbs.VerbType.PERS:
+        action = verbdata[3] if with_targets else verbdata[2]
+    elif vtype == verbs.VerbType.SIMP:
+        action = verbdata[2]
+    else:
+        raise TaleError("invalid vtype " + str(vtype))
+    if with_targets and len(verbdata) > 3:
+        action = action.replace(" \nAT", _spacify(verbdata[3]) + " \nWHO")
+    else:
+        action = action.replace(" \nAT", "")
+    needs_person = not with_targets and ("\nWHO" in action or "\nPOSS" in action)
+    action = _format_string(action, default_where)
+    return VerbTemplate(vtype, action.replace("$", ""), action.replace("$", "s"), needs_person)
+
+
+_compiled: Dict[Tuple[str, bool, bool], VerbTemplate] = {}
+
+
+def get(verb: str, with_targets: bool, with_bodypart: bool, verbdata: Optional[Tuple] = None) -> VerbTemplate:
+    """
+    Returns the compiled template for the given soul verb. Compiles it on first use,
+    from the given verb data or else the data in the verb table.
+    """
+    compiled = _compiled
+    try:
+        return compiled[verb, with_targets, with_bodypart]
+    except KeyError:
+        template = compile_verb(verb, verbdata or verbs.VERBS[verb], with_targets, with_bodypart)
+        compiled[verb, with_targets, with_bodypart] = template
+        return template
@@ -0,0 +1,107 @@
+"""
+Indexes on a fixed set of words: prefix lookup and spelling suggestions.
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class PrefixIndex:
+    """
+    Finds the words that start with a prefix in O(k) (k = length of the prefix).
+    Every prefix of every word is mapped to the range of words in the sorted word list that start with it.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self.words = sorted(set(words))
+        self._ranges: Dict[str, Tuple[int, int]] = {"": (0, len(self.words))}
+        for position, word in enumerate(self.words):
+            for length in range(1, len(word) + 1):
+                prefix = word[:length]
+                start, _ = self._ranges.get(prefix, (position, 0))
+                self._ranges[prefix] = (start, position + 1)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def search(self, prefix: str, amount: int = 0) -> List[str]:
+        """Returns the words (sorted) that start with the prefix, up to the given amount (0 = all of them)."""
+        start, end = self._ranges.get(prefix, (0, 0))
+        if amount and end - start > amount:
+            end = start + amount
+        return self.words[start:end]
+
+    def count(self, prefix: str) -> int:
+        start, end = self._ranges.get(prefix, (0, 0))
+        return end - start
+
+
+class SpellIndex:
+    """
+    Suggests the words that are within a small edit distance of a (misspelled) word,
+    using a deletion neighbourhood: every word is indexed under all variants of itself with up to
+    max_distance characters deleted. A misspelled word shares at least one of those variants with the
+    words it is close to, so only those few candidates need their actual distance computed.
+    The distance is the optimal string alignment distance (Levenshtein plus transpositions of adjacent characters).
+    """
+
+    def __init__(self, words: Iterable[str], max_distance: int = 1) -> None:
+        self.max_distance = max_distance
+        self._deletes: Dict[str, List[str]] = {}
+        for word in set(words):
+            for variant in self._variants(word):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def _variants(self, word: str) -> Set[str]:
+        """the word itself and all words that result from deleting up to max_distance characters"""
+        variants = {word}
+        current = {word}
+        for _ in range(self.max_distance):
+            current = {variant[:i] + variant[i + 1:] for variant in current for i in range(len(variant))}
+            variants |= current
+        return variants
+
+    def suggest(self, word: str, amount: int = 5) -> List[str]:
+        """
+        Returns the words closest to the given word (at most max_distance edits away, excluding the word itself),
+        ordered by distance and then alphabetically, up to the given amount.
+        """
+        return [candidate for _, candidate in self.candidates(word)[:amount]]
+
+    def candidates(self, word: str) -> List[Tuple[int, str]]:
+        """Returns all (distance, word) within max_distance of the given word (excluding the word itself), sorted."""
+        candidates: Set[str] = set()
+        for variant in self._variants(word):
+            candidates.update(self._deletes.get(variant, ()))
+        candidates.discard(word)
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, self.max_distance)
+            if distance <= self.max_distance:
+                scored.append((distance, candidate))
+        scored.sort()
+        return scored
+
+
+def edit_distance(a: str, b: str, limit: int = 0) -> int:
+    """
+    Optimal string alignment distance between a and b.
+    If a limit is given, the result is limit + 1 as soon as the distance is known to exceed it.
+    """
+    if limit and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if limit and min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
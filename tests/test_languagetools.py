@@ -5,8 +5,11 @@ Unittests for languagetools
 Copyright by Irmen de Jong (irmen@razorvine.net)
 """
 
+import collections
 import pytest
 import tale_ng.lang as lang
+import tale_ng.numberwords as numberwords
+from tale_ng.objects import Living
 
 
 def test_a():
@@ -74,6 +77,22 @@ def test_a_exceptions():
     assert lang.A("seventieth egg") == "The seventieth egg"
 
 
+def test_a_many():
+    phrases = ["house", "egg", "hour", "fifth egg", "some egg", "", "-- sword", "- an egg", "YARD"]
+    assert lang.a_many(phrases) == [lang.a(phrase) for phrase in phrases]
+    assert lang.a_many(phrases, capitalized=True) == [lang.A(phrase) for phrase in phrases]
+    assert lang.a_many(["an egg", "egg"]) == ["an egg", "an egg"]
+    assert lang.a_many(iter(["umbrella"]), capitalized=True) == ["An umbrella"]
+
+
+def test_a_punctuation():
+    # the article of a phrase that starts with punctuation depends on the first real word
+    assert lang.a("-- sword") == "a -- sword"
+    assert lang.a("-- egg") == "an -- egg"
+    assert lang.a("- an egg") == "- an egg"
+    assert lang.a("x-ray gun") == "an x-ray gun"
+
+
 def test_fullstop():
     assert lang.fullstop("a") == "a."
     assert lang.fullstop("a ") == "a."
@@ -113,6 +132,23 @@ def test_join_multi():
     assert lang.join(["key", "bike"] * 2, group_multi=False) == "key, bike, key, and bike"
 
 
+def test_join_limit():
+    assert lang.join(["apple", "bike", "key", "mouse"], limit=2) == "apple, bike, and two more"
+    assert lang.join(["apple", "bike", "key"], limit=2) == "apple, bike, and one more"
+    assert lang.join(["apple", "bike"], limit=2) == "apple and bike"
+    assert lang.join(["apple", "bike", "bike", "key", "key"], limit=1) == "apple and four more"
+    assert lang.join(["apple", "bike"], limit=1, group_multi=False, conj="or") == "apple or one more"
+
+
+def test_join_counted():
+    counts = collections.Counter({"a gold coin": 1000, "a ruby": 3, "an emerald": 1, "a diamond": 0})
+    assert lang.join_counted(counts) == "one thousand gold coins, three rubies, and an emerald"
+    assert lang.join_counted(counts, limit=1) == "one thousand gold coins and four more"
+    assert lang.join_counted([("a key", 2), ("a bike", 1)]) == "two keys and a bike"
+    assert lang.join_counted(iter([("a key", 1)]), conj="or") == "a key"
+    assert lang.join_counted({}) == ""
+
+
 def test_possessive():
     assert lang.possessive_letter("") == ""
     assert lang.possessive_letter("julie") == "'s"
@@ -141,6 +177,29 @@ def test_split():
     assert lang.split("a  '  b c \"hi!\" d '   e") == ["a", "b c \"hi!\" d", "e"]
     assert lang.split("a 'b") == ["a", "'b"]
     assert lang.split("a \"b") == ["a", "\"b"]
+    assert lang.split("don't say 'don't do that', ok") == ["don't", "say", "don't do that", ",", "ok"]
+
+
+def test_tokenize():
+    W, Q, P = lang.TokenType.WORD, lang.TokenType.QUOTED, lang.TokenType.PUNCT
+    assert lang.tokenize("") == []
+    assert lang.tokenize("  smile  bob , 'hi there'!") == [
+        (W, "smile", 2, 7), (W, "bob", 9, 12), (P, ",", 13, 14), (Q, "hi there", 15, 25), (P, "!", 25, 26)]
+    assert lang.tokenize("say 'don't'") == [(W, "say", 0, 3), (Q, "don't", 4, 11)]
+    assert lang.tokenize("a 'b 'c \"d") == [(W, "a", 0, 1), (W, "'b", 2, 4), (W, "'c", 5, 7), (W, "\"d", 8, 10)]
+    assert lang.tokenize("''") == [(Q, "", 0, 2)]
+    # many unclosed quotes must not make it slow
+    tokens = lang.tokenize("'x " * 20000)
+    assert len(tokens) == 20000
+    assert all(token.type is W for token in tokens)
+    # nor do long runs of quotes
+    tokens = lang.tokenize("say " + "'" * 20001)
+    assert len(tokens) == 10002
+    assert tokens[1] == (Q, "", 4, 6) and tokens[-2] == (Q, "", 20002, 20004) and tokens[-1] == (P, "'", 20004, 20005)
+    tokens = lang.tokenize("say " + "\"'" * 10000)
+    assert len(tokens) == 6668
+    assert tokens[1] == (Q, "'", 4, 7) and tokens[2] == (Q, "\"", 7, 10)
+    assert lang.split("'a" * 20000) == ["'a" * 20000]
 
 
 def test_fullverb():
@@ -162,8 +221,8 @@ def test_numberspell():
     assert lang.spell_number(-45) == "minus forty-five"
     assert lang.spell_number(99) == "ninety-nine"
     assert lang.spell_number(-99) == "minus ninety-nine"
-    assert lang.spell_number(100) == "100"
-    assert lang.spell_number(-100) == "minus 100"
+    assert lang.spell_number(100) == "one hundred"
+    assert lang.spell_number(-100) == "minus one hundred"
     assert lang.spell_number(-1) == "minus one"
     assert lang.spell_number(-20) == "minus twenty"
     assert lang.spell_number(2.5) == "two and a half"
@@ -178,13 +237,39 @@ def test_numberspell():
     assert lang.spell_number(3.004) == "about three"
     assert lang.spell_number(3.004) == "about three"
     assert lang.spell_number(99.004) == "about ninety-nine"
-    assert lang.spell_number(99.996) == "about 100"
+    assert lang.spell_number(99.996) == "about one hundred"
     assert lang.spell_number(-2.996) == "about minus three"
     assert lang.spell_number(-3.004) == "about minus three"
     assert lang.spell_number(-99.004) == "about minus ninety-nine"
     assert lang.spell_number(-3.006) == "-3.006"
 
 
+def test_numberspell_large():
+    assert lang.spell_number(101) == "one hundred and one"
+    assert lang.spell_number(1005) == "one thousand and five"
+    assert lang.spell_number(1234) == "one thousand two hundred and thirty-four"
+    assert lang.spell_number(-20000) == "minus twenty thousand"
+    assert lang.spell_number(1000200) == "one million two hundred"
+    assert lang.spell_number(3000000042) == "three billion and forty-two"
+    assert lang.spell_number(1234.5) == "one thousand two hundred and thirty-four and a half"
+    assert lang.spell_number(10 ** 15) == "1000000000000000"
+    assert lang.spell_ordinal(1000) == "one thousandth"
+    assert lang.spell_ordinal(12345) == "twelve thousand three hundred and forty-fifth"
+    assert lang.spell_ordinal(2000000) == "two millionth"
+    assert lang.spell_ordinal(10 ** 15) == "1000000000000000th"
+
+
+def test_numberspell_precompute():
+    try:
+        numberwords.precompute(100)
+        assert lang.spell_number(99) == "ninety-nine"
+        assert lang.spell_number(5000) == "five thousand"
+        assert lang.spell_ordinal(5000) == "five thousandth"
+    finally:
+        numberwords.precompute()
+    assert lang.spell_number(5000) == "five thousand"
+
+
 def test_ordinal():
     assert lang.ordinal(0) == "0th"
     assert lang.ordinal(1) == "1st"
@@ -223,8 +308,9 @@ def test_spell_ordinal():
     assert lang.spell_ordinal(70) == "seventieth"
     assert lang.spell_ordinal(76) == "seventy-sixth"
     assert lang.spell_ordinal(99) == "ninety-ninth"
-    assert lang.spell_ordinal(100) == "100th"
-    assert lang.spell_ordinal(101) == "101st"
+    assert lang.spell_ordinal(100) == "one hundredth"
+    assert lang.spell_ordinal(101) == "one hundred and first"
+    assert lang.spell_ordinal(-70) == "minus seventieth"
 
 
 def test_pluralize():
@@ -249,6 +335,33 @@ def test_pluralize():
     assert lang.pluralize("buoy") == "buoys"
 
 
+def test_pluralize_many():
+    assert lang.pluralize_many(["car", "mouse", "lady", "car"]) == ["cars", "mice", "ladies", "cars"]
+    assert lang.pluralize_many(iter(["car", "mouse"]), amount=1) == ["car", "mouse"]
+    assert lang.join(["a key", "a key", "a mouse", "a mouse", "a mouse", "a lady"]) == "two keys, three mice, and a lady"
+
+
+def test_load_plurals(tmp_path):
+    lexicon = vars(lang)["__plural_irregularities"]
+    path = tmp_path / "plurals.txt"
+    path.write_text("# test lexicon\n\ncactus cacti\nbrother in arms\tbrothers in arms\n", encoding="utf-8")
+    assert lang.pluralize("cactus") == "cactuses"
+    try:
+        assert lang.load_plurals(str(path)) == 2
+        assert lang.pluralize("cactus") == "cacti", "the cached plural must be replaced"
+        assert lang.pluralize("brother in arms") == "brothers in arms"
+        assert lang.pluralize("mouse") == "mice"
+        lang.add_plurals({"cactus": "cactuses"})
+        assert lang.pluralize("cactus") == "cactuses"
+        path.write_text("cactus\n", encoding="utf-8")
+        with pytest.raises(ValueError):
+            lang.load_plurals(str(path))
+    finally:
+        lexicon.pop("cactus", None)
+        lexicon.pop("brother in arms", None)
+        lang.add_plurals({})
+
+
 def test_yesno():
     assert lang.yesno("y")
     assert lang.yesno("Yes")
@@ -293,3 +406,49 @@ def test_gender_mf():
         lang.validate_gender_mf("")
     with pytest.raises(ValueError):
         lang.validate_gender_mf("nope")
+
+
+def test_third_person():
+    assert lang.third_person("smile") == "smiles"
+    assert lang.third_person("kiss") == "kisses"
+    assert lang.third_person("cry") == "cries"
+    assert lang.third_person("play") == "plays"
+    assert lang.third_person("go") == "goes"
+    assert lang.third_person("be") == "is"
+
+
+def test_message_template():
+    max_, kate, bob = Living("max", "m", title="Max"), Living("kate", "f", title="Kate"), Living("bob", "m", title="Bob")
+    template = lang.MessageTemplate("{Actor.subj} {verb:s} {target.poss} foot.")
+    assert template.names == {"actor", "verb", "target"}
+    assert template.render(max_, actor=max_, target=kate, verb="kick") == "You kick her foot."
+    assert template.render(kate, actor=max_, target=kate, verb="kick") == "He kicks your foot."
+    assert template.render(bob, actor=max_, target=kate, verb="kick") == "He kicks her foot."
+    assert template.render(max_, actor=max_, target=max_, verb="kick") == "You kick your own foot."
+    assert template.render(bob, actor=max_, target=max_, verb="kick") == "He kicks his own foot."
+    template = lang.MessageTemplate("{Actor} {verb:s} {target}, {actor.poss_title} friend number {number}. {Actor.subj} {be:s} {{glad}}.")
+    values = {"actor": max_, "target": kate, "verb": "poke", "be": "be", "number": 1}
+    assert template.render(max_, **values) == "You poke Kate, your friend number 1. You are {glad}."
+    assert template.render(kate, **values) == "Max pokes you, Max's friend number 1. He is {glad}."
+    values["target"] = max_
+    assert template.render(None, **values) == "Max pokes himself, Max's friend number 1. He is {glad}."
+    values["target"] = kate
+    assert template.render_many([max_, kate, bob, None], **values) == [
+        "You poke Kate, your friend number 1. You are {glad}.",
+        "Max pokes you, Max's friend number 1. He is {glad}.",
+        "Max pokes Kate, Max's friend number 1. He is {glad}.",
+        "Max pokes Kate, Max's friend number 1. He is {glad}."]
+    with pytest.raises(ValueError):
+        lang.MessageTemplate("{actor.nose}")
+    with pytest.raises(ValueError):
+        lang.MessageTemplate("{verb:x}")
+
+
+def test_render_message():
+    max_ = Living("max", "m", title="Max")
+    assert lang.render_message("{Actor} {verb:s}.", max_, actor=max_, verb="smile") == "You smile."
+    assert lang.render_message("{Actor} {verb:s}.", actor=max_, verb="smile") == "Max smiles."
+    assert lang.message_template("{Actor} {verb:s}.") is lang.message_template("{Actor} {verb:s}.")
+    # without an actor, nobody is the actor (not even the observer None)
+    assert lang.render_message("The bell {verb:s}.", verb="ring") == "The bell rings."
+    assert lang.render_message("{Target} {verb:s}.", None, target=max_, verb="fall") == "Max falls."
@@ -0,0 +1,161 @@
+"""
+Unit tests for the mud objects and their name indexes
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import pytest
+from tale_ng.objects import Location, Living, Item, Exit
+from tale_ng.nameindex import NameIndex, IndexedSet, NameMap, WordTrie, match_longest, search_prefix
+from tale_ng.soul.parse import Soul, NonSoulVerbError
+
+
+def test_nameindex():
+    index = NameIndex()
+    rat1 = Item("rat", aliases={"rodent"})
+    rat2 = Item("rat")
+    index.add(rat1)
+    index.add(rat2)
+    index.add(rat1)
+    assert len(index) == 2
+    assert index["rat"] is rat1, "first added object must win"
+    assert index["rodent"] is rat1
+    assert index.get("mouse") is None
+    version = index.version
+    index.discard(rat1)
+    assert index.version > version
+    assert index["rat"] is rat2
+    assert "rodent" not in index
+    index.discard(rat1)
+    index.clear()
+    assert len(index) == 0
+    assert "rat" not in index
+
+
+def test_location_index():
+    room = Location("hall")
+    julie = Living("julie", "f")
+    julie.aliases = {"jules"}
+    assert "julie" not in room.livings.index
+    julie.move(room)
+    assert room.livings.index["julie"] is julie
+    assert room.livings.index["jules"] is julie
+    julie.aliases = {"jj"}
+    assert "jules" not in room.livings.index, "alias change must update the index"
+    assert room.livings.index["jj"] is julie
+    julie.add_alias("jay")
+    assert julie.aliases == {"jj", "jay"}
+    assert room.livings.index["jay"] is julie, "a new alias must be indexed"
+    with pytest.raises(AttributeError):
+        julie.aliases.add("jules")      # type: ignore
+    julie.move(Location("kitchen"))
+    assert "julie" not in room.livings.index
+    assert "jj" not in room.livings.index
+    rock = Item("rock")
+    room.items.add(rock)
+    assert room.items.index["rock"] is rock
+    room.items = {Item("stone")}
+    assert "rock" not in room.items.index
+    assert "stone" in room.items.index
+    room.items = room.items
+    assert "stone" in room.items.index
+    assert isinstance(room.items, IndexedSet)
+
+
+def test_inventory_index():
+    room = Location("hall")
+    julie = Living("julie", "f", location=room)
+    key = Item("key", aliases={"brass key"})
+    julie.insert(key)
+    assert julie.inventory == {key}
+    assert julie.inventory_index["brass key"] is key
+    assert julie.search_item("key") is key
+    assert julie.search_item("key", include_inventory=False) is None
+    rock = Item("rock")
+    room.items.add(rock)
+    assert julie.search_item("rock") is rock
+    assert julie.search_item("rock", include_location=False) is None
+    julie.remove(key)
+    assert "key" not in julie.inventory_index
+    assert julie.search_item("key") is None
+
+
+def test_wordtrie():
+    trie = WordTrie(["door", "door one", "rusty iron key", "rusty iron key of the north gate"])
+    words = "open the rusty iron key of the north gate please".split()
+    assert trie.match(words, 2) == ("rusty iron key of the north gate", 7), "must find longest match, without word limit"
+    assert trie.match(words, 0) == ("", 0)
+    assert trie.match(["door", "two"], 0) == ("door", 1)
+    assert trie.match(["door", "one"], 0) == ("door one", 2)
+    assert trie.match(["door", ""], 0) == ("door", 1)
+    trie.remove("door")
+    assert trie.match(["door", "two"], 0) == ("", 0)
+    assert trie.match(["door", "one"], 0) == ("door one", 2)
+    trie.remove("rusty iron key of the north gate")
+    assert trie.match(words, 2) == ("rusty iron key", 3)
+    trie.remove("nonexisting name")
+
+
+def test_namemap_exits():
+    room = Location("hall")
+    gate = Exit(["north gate", "gate"], room, "the gate")
+    gate.bind(room)
+    assert isinstance(room.exits, NameMap)
+    assert room.exits["gate"] is gate
+    assert room.exits.match(["north", "gate", "now"], 0) == (gate, "north gate", 2)
+    del room.exits["north gate"]
+    assert room.exits.match(["north", "gate", "now"], 0) == (None, "", 0)
+    assert room.exits.match(["gate"], 0) == (gate, "gate", 1)
+
+
+def test_assign_exits():
+    room = Location("hall")
+    exits = room.exits
+    door = Exit("door", room, "a door")
+    version = exits.version
+    room.exits = {"door": door, "big door": door}
+    assert room.exits is exits, "the exits must remain the same NameMap"
+    assert room.exits.version > version
+    assert room.exits.match(["big", "door"], 0) == (door, "big door", 2)
+    room.exits = {}
+    assert room.exits.match(["door"], 0) == (None, "", 0)
+    player = Living("julie", "f")
+    player.move(room)
+    room.exits = {"door": door}
+    soul = Soul(parse_cache_size=10)
+    with pytest.raises(NonSoulVerbError) as x:
+        soul.parse(player, "door")
+    assert x.value.parsed.who_objects == [door]
+
+
+def test_match_longest():
+    room = Location("hall")
+    key = Item("key")
+    long_key = Item("rusty iron key")
+    room.items = [key, long_key]
+    bird = Living("bird", "n")
+    bird.move(room)
+    door = Exit("rusty iron", room, "door")
+    door.bind(room)
+    words = ["rusty", "iron", "key"]
+    assert match_longest([room.livings.index, room.items.index, room.exits], words, 0) == (long_key, "rusty iron key", 3)
+    assert match_longest([room.livings.index, room.exits], words, 0) == (door, "rusty iron", 2)
+    assert match_longest([room.livings.index, room.items.index, room.exits], words, 2) == (key, "key", 1)
+
+
+def test_search_prefix():
+    room = Location("hall")
+    room.items = [Item("rusty key"), Item("rope"), Item("ruby", aliases={"gem"})]
+    index = room.items.index
+    assert index.search_prefix("ru") == ["ruby", "rusty key"]
+    assert index.search_prefix("r", 2) == ["rope", "ruby"]
+    assert index.search_prefix("x") == []
+    room.items.add(Item("rug"))
+    room.items.discard(index["rope"])
+    assert index.search_prefix("r") == ["rug", "ruby", "rusty key"]
+    backpack = NameIndex()
+    backpack.add(Item("rum"))
+    backpack.add(Item("ruby"))
+    assert search_prefix([index, backpack], "ru") == ["rug", "rum", "ruby", "rusty key"]
+    assert search_prefix([index, backpack], "ru", 2) == ["rug", "rum"]
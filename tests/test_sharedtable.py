@@ -0,0 +1,57 @@
+"""
+Unit tests for the shared read-only tables
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+import os
+import pytest
+from tale_ng.sharedtable import SharedTable, SortedKeys, encode_table, write_tables, open_tables
+
+
+def test_sharedtable():
+    entries = {"smile": ("DEFA", None, "smiles"), "grin": [1, 2], "nod": None, "café": "ok"}
+    table = SharedTable(memoryview(encode_table(entries)))
+    assert len(table) == 4
+    assert list(table) == ["café", "grin", "nod", "smile"]
+    assert table["smile"] == ("DEFA", None, "smiles")
+    assert table["café"] == "ok"
+    assert table["nod"] is None
+    assert "nod" in table
+    assert "no" not in table
+    assert 42 not in table
+    assert table.get("wave") is None
+    with pytest.raises(KeyError):
+        table["wave"]
+    assert dict(table) == entries
+    keys = SortedKeys(table)
+    assert keys[0] == "café"
+    assert keys[-1] == "smile"
+    assert keys[1:3] == ["grin", "nod"]
+    with pytest.raises(IndexError):
+        keys[4]
+    empty = SharedTable(memoryview(encode_table({})))
+    assert len(empty) == 0
+    assert "x" not in empty
+
+
+def test_encode_decode():
+    table = SharedTable(memoryview(encode_table({"a": 1, "b": 2}, encode=str)), decode=int)
+    assert table["a"] == 1
+    assert table["b"] == 2
+
+
+def test_tables_file(tmpdir):
+    path = os.path.join(str(tmpdir), "tables.shared")
+    words = {"word%d" % number: number for number in range(1000)}
+    write_tables(path, b"TEST", {"words": encode_table(words), "names": encode_table(dict.fromkeys(["bob", "alice"]))})
+    tables = open_tables(path, b"TEST")
+    assert set(tables) == {"words", "names"}
+    assert tables["words"]["word123"] == 123
+    assert dict(tables["words"]) == words
+    assert list(tables["names"]) == ["alice", "bob"]
+    assert open_tables(path, b"XXXX") is None
+    with open(path, "wb"):
+        pass
+    assert open_tables(path, b"TEST") is None
@@ -5,12 +5,24 @@ Unit tests for the Soul (NG)
 Copyright by Irmen de Jong (irmen@razorvine.net)
 """
 
+import os
+import subprocess
+import sys
 import unittest
 import collections
+import tempfile
+import types
 
 import tale_ng.soul.parse as parse
 import tale_ng.soul.adverbs as adverbs
+import tale_ng.soul.benchmark as benchmark
+import tale_ng.soul.instrumentation as instrumentation
+import tale_ng.soul.registry as registry
+import tale_ng.soul.tables as tables
+import tale_ng.soul.templates as templates
+import tale_ng.soul.verbs as verbs
 from tale_ng.objects import Location, Living, Item, Exit
+from tale_ng.errors import TaleError
 
 
 class TestSoulNG(unittest.TestCase):
@@ -38,6 +50,18 @@ class TestSoulNG(unittest.TestCase):
         self.assertEqual("_unknown_verb_", ex.exception.verb)
         self.assertEqual("fail", ex.exception.qualifier)
         self.assertEqual(["_unknown_verb_", "herp", "derp"], ex.exception.words)
+        self.assertEqual([], ex.exception.suggestions)
+        with self.assertRaises(parse.UnknownVerbError) as ex:
+            soul.process_verb(player, "fail smiel at herp")
+        self.assertEqual("smiel", ex.exception.verb)
+        self.assertEqual(["smile"], ex.exception.suggestions)
+        with self.assertRaises(parse.UnknownVerbError) as ex:
+            soul.parse(player, "lok around", external_verbs={"look", "take"})
+        self.assertEqual(["look"], ex.exception.suggestions, "external verbs must be suggested too")
+        self.assertEqual(["grin", "groan"], soul.suggest_verbs("gron", {"groan"}), "no duplicates, closest first")
+        self.assertEqual(["nod", "nods"], soul.suggest_verbs("nodd", {"nods"}))
+        self.assertEqual(["nod"], soul.suggest_verbs("nodd", {"nods"}, amount=1))
+        self.assertEqual([], soul.suggest_verbs("nod"))
         self.assertTrue(soul.is_verb("bounce"))
         self.assertFalse(soul.is_verb("_unknown_verb_"))
 
@@ -222,6 +246,24 @@ class TestSoulNG(unittest.TestCase):
         self.assertEqual([kate, cat], list(parsed.who_info))
         self.assertEqual(2, parsed.who_count)
         self.assertEqual((kate, cat, None), parsed.who_123)
+        # the targets can only be changed through the methods
+        with self.assertRaises(TypeError):
+            parsed.who_info[player] = parse.ParseResult.WhoInfo()
+        with self.assertRaises(AttributeError):
+            parsed.who_count = 3
+        parsed.add_who(player, 2)
+        self.assertEqual([kate, cat, player], list(parsed.who_info))
+        self.assertEqual(3, parsed.who_count)
+        # but a comma is part of the message of a message verb
+        parsed = soul.parse(player, "say kate, hello")
+        self.assertEqual(0, parsed.who_count)
+        self.assertEqual("kate, hello", parsed.message)
+        parsed = soul.parse(player, "mumble kate, cat")
+        self.assertEqual(0, parsed.who_count)
+        self.assertEqual("kate, cat", parsed.message)
+        parsed = soul.parse(player, "say kate hello")
+        self.assertEqual([kate], list(parsed.who_info))
+        self.assertEqual("hello", parsed.message)
 
     def test_sanity(self):
         who_info = collections.OrderedDict()
@@ -238,6 +280,35 @@ class TestSoulNG(unittest.TestCase):
         with self.assertRaises(parse.ParseError):
             parse.ParseResult("walk", who_info=None, who_list=who_list)
 
+    def testParseResultArrays(self):
+        cat = Living("cat", "f")
+        dog = Living("dog", "m")
+        bird = Living("bird", "n")
+        parsed = parse.ParseResult("smile")
+        self.assertFalse(hasattr(parsed, "__dict__"), "parse results must be slotted")
+        self.assertEqual((None, None), parsed.who_12)
+        self.assertIsNone(parsed.who_last)
+        parsed.add_who(cat, 0, "at")
+        parsed.add_who(dog, 1, "and")
+        parsed.add_who(bird, 2)
+        parsed.add_who(cat, 3, "and")
+        self.assertEqual([cat, dog, bird], parsed.who_objects, "adding an existing who keeps its position")
+        self.assertEqual([3, 1, 2], parsed.who_sequences)
+        self.assertEqual(["and", "and", ""], parsed.who_previous_words)
+        self.assertEqual(3, parsed.who_info[cat].sequence)
+        self.assertEqual((cat, dog), parsed.who_12)
+        self.assertTrue(parsed.remove_who(dog))
+        self.assertFalse(parsed.remove_who(dog))
+        self.assertEqual([cat, bird], list(parsed.who_info))
+        self.assertEqual((cat, bird, None), parsed.who_123)
+        self.assertEqual(bird, parsed.who_last)
+        copied = parsed.copy()
+        parsed.clear_who()
+        self.assertEqual(0, parsed.who_count)
+        self.assertEqual({}, parsed.who_info)
+        self.assertEqual([cat, bird], copied.who_objects)
+        self.assertEqual(2, copied.who_info[bird].sequence)
+
     def test_who123(self):
         soul = parse.Soul()
         player = Living("julie", "f")
@@ -444,6 +515,29 @@ class TestSoulNG(unittest.TestCase):
         with self.assertRaises(parse.ParseError) as ex:
             soul.process_verb(player, "cough si")
         self.assertEqual("What adverb did you mean: sickly, sideways, signally, significantly, or silently?", str(ex.exception))
+        # check handling of misspelled adverbs
+        self.assertEqual(["happily"], adverbs.suggest("happliy"))
+        self.assertEqual(["happily", "hazily"], adverbs.suggest("hapily"))
+        self.assertEqual([], adverbs.suggest("happily"), "a correct adverb needs no suggestions")
+        self.assertEqual([], adverbs.suggest("hubbabubba"))
+        with self.assertRaises(parse.ParseError) as ex:
+            soul.process_verb(player, "cough quikly")
+        self.assertEqual("Perhaps you meant quickly?", str(ex.exception))
+        with self.assertRaises(parse.ParseError) as ex:
+            soul.process_verb(player, "smile hapily")
+        self.assertEqual("Perhaps you meant happily or hazily?", str(ex.exception))
+        # the spelling index is only built when a word is not understood
+        adverbs._spell_index = None
+        soul.process_verb(player, "smile happily")
+        soul.process_verb(player, "smile happi")
+        self.assertIsNone(adverbs._spell_index)
+        with self.assertRaises(parse.ParseError):
+            soul.process_verb(player, "smile hapily")
+        self.assertIsNotNone(adverbs._spell_index)
+        old_table = adverbs.ADVERBS
+        self.assertIs(adverbs.spell_index(), adverbs.spell_index(old_table))
+        self.assertEqual(["zappily"], adverbs.spell_index({"zappily"}).suggest("zapily"))
+        self.assertEqual(["zappily"], adverbs.prefix_index({"zappily"}).search("za"))
 
     def testUnrecognisedWord(self):
         soul = parse.Soul()
@@ -477,6 +571,10 @@ class TestSoulNG(unittest.TestCase):
         self.assertEqual((brown_bird, "brown bird", 2), result)
         result = soul.check_name_with_spaces(["go", "south", "bound", "somewhere", "yes"], 1, livings, items, exits)
         self.assertEqual((exit_south, "south bound somewhere", 3), result)
+        long_key = Item("RUSTY IRON KEY OF THE NORTH GATE")
+        items = {"rusty iron key": Item("RUSTY IRON KEY"), "rusty iron key of the north gate": long_key}
+        result = soul.check_name_with_spaces(["open", "rusty", "iron", "key", "of", "the", "north", "gate"], 1, livings, items, exits)
+        self.assertEqual((long_key, "rusty iron key of the north gate", 7), result, "must find the longest name")
 
     def testCheckNamesWithSpacesParsing(self):
         soul = parse.Soul()
@@ -507,6 +605,9 @@ class TestSoulNG(unittest.TestCase):
         self.assertEqual([gate], list(parsed.who_info))
         with self.assertRaises(parse.UnknownVerbError):
             soul.parse(player, "door")
+        parsed = soul.parse(player, "hug brown bird, gate")
+        self.assertEqual(["brown bird", "gate"], parsed.args)
+        self.assertEqual([bird, gate], list(parsed.who_info))
         parsed = soul.parse(player, "enter door two", external_verbs={"enter"})
         self.assertEqual("enter", parsed.verb)
         self.assertEqual(["door two"], parsed.args)
@@ -623,6 +724,11 @@ class TestSoulNG(unittest.TestCase):
         with self.assertRaises(parse.ParseError) as x:
             soul.parse(player, "slap news")
         self.assertEqual("Perhaps you meant newspaper?", str(x.exception), "must suggest item with prefix")
+        player.insert(Item("newsletter"))
+        player.location.items.add(Item("new moon"))
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(player, "slap new")
+        self.assertEqual("Perhaps you meant new moon, newspaper, or newsletter?", str(x.exception), "closest completions first")
         with self.assertRaises(parse.ParseError) as x:
             soul.parse(player, "slap undefined")
         self.assertEqual("It's not clear what you mean by 'undefined'.", str(x.exception))
@@ -640,6 +746,435 @@ class TestSoulNG(unittest.TestCase):
         self.assertEqual(["kate", "ofcourse,", "darling."], parsed.args, "must be able to skip comma")
         self.assertEqual(1, parsed.who_count)
 
+    def testParseMany(self):
+        soul = parse.Soul()
+        room1 = Location("room1")
+        room2 = Location("room2")
+        julie = Living("julie", "f")
+        max_npc = Living("max", "m")
+        kate = Living("kate", "f")
+        julie.move(room1)
+        max_npc.move(room1)
+        kate.move(room2)
+        room2.items.add(Item("newspaper"))
+        results = soul.parse_many([(julie, "smile at max"), (kate, "point at newspaper"), (max_npc, "undefined"), (julie, "kiss kate")])
+        self.assertEqual(4, len(results))
+        self.assertIsInstance(results[0], parse.ParseResult)
+        self.assertEqual("smile", results[0].verb)
+        self.assertEqual([max_npc], list(results[0].who_info))
+        self.assertEqual("point", results[1].verb)
+        self.assertEqual(["newspaper"], results[1].args)
+        self.assertIsInstance(results[2], parse.UnknownVerbError)
+        self.assertIsInstance(results[3], parse.ParseError)
+        self.assertEqual("It's not clear what you mean by 'kate'.", str(results[3]), "kate is not in julie's room")
+        self.assertEqual([], soul.parse_many([]))
+        # a scope for another location must not be used
+        parsed = soul.parse(kate, "smile at max", scope=parse.ParseScope(room1))
+        self.assertEqual([], list(parsed.who_info))
+
+    def testParseCache(self):
+        soul = parse.Soul(parse_cache_size=2)
+        self.assertIsNone(parse.Soul().parse_cache)
+        room = Location("somewhere")
+        julie = Living("julie", "f")
+        max_npc = Living("max", "m")
+        julie.move(room)
+        max_npc.move(room)
+        parsed = soul.parse(julie, "smile at max")
+        self.assertEqual((0, 1), (soul.parse_cache.hits, soul.parse_cache.misses))
+        parsed.verb = "mutated"
+        parsed.args.append("mutated")
+        parsed2 = soul.parse(julie, "smile at max")
+        self.assertEqual((1, 1), (soul.parse_cache.hits, soul.parse_cache.misses))
+        self.assertEqual("smile", parsed2.verb, "cached result must not be affected by changes to a returned result")
+        self.assertEqual(["max"], parsed2.args)
+        self.assertEqual([max_npc], list(parsed2.who_info))
+        self.assertIsNot(parsed, parsed2)
+        # when max leaves the room, the cached result must no longer be used
+        max_npc.move(Location("elsewhere"))
+        self.assertEqual([], list(soul.parse(julie, "smile at max").who_info))
+        self.assertEqual((1, 2), (soul.parse_cache.hits, soul.parse_cache.misses))
+        max_npc.move(room)
+        soul.parse(julie, "smile at max")
+        soul.parse(julie, "nod")
+        soul.parse(julie, "grin")
+        self.assertEqual(2, len(soul.parse_cache), "cache size must be bounded")
+        # a pronoun depends on the previous parse
+        soul.remember_previous_parse(soul.parse(julie, "nod at max"))
+        self.assertEqual([max_npc], list(soul.parse(julie, "kiss him").who_info))
+        soul.remember_previous_parse(soul.parse(julie, "nod at julie"))
+        with self.assertRaises(parse.ParseError):
+            soul.parse(julie, "kiss him")
+        soul.parse_cache.clear()
+        self.assertEqual((0, 0, 0), (len(soul.parse_cache), soul.parse_cache.hits, soul.parse_cache.misses))
+        # commands that only differ in whitespace share an entry, but the unparsed text is their own
+        self.assertEqual("at max", soul.parse(julie, "smile at max").unparsed)
+        parsed = soul.parse(julie, "  smile   at  max ")
+        self.assertEqual((1, 1), (soul.parse_cache.hits, soul.parse_cache.misses))
+        self.assertEqual("at  max ", parsed.unparsed)
+        self.assertEqual([max_npc], list(parsed.who_info))
+        self.assertEqual("'Hello  there'", soul.parse(julie, "say   'Hello  there'", {"say"}).unparsed)
+        self.assertEqual("'Hello there'", soul.parse(julie, "say 'Hello there'", {"say"}).unparsed)
+        self.assertEqual((1, 3), (soul.parse_cache.hits, soul.parse_cache.misses), "quoted text keeps its whitespace")
+        # the result depends on the abbreviation of verbs
+        soul.parse_cache.clear()
+        with self.assertRaises(parse.ParseError):
+            soul.parse(julie, "tickl max")
+        soul.abbreviate_verbs = True
+        self.assertEqual("tickle", soul.parse(julie, "tickl max").verb)
+        soul.abbreviate_verbs = False
+        with self.assertRaises(parse.ParseError):
+            soul.parse(julie, "tickl max")
+
+    def testBenchmark(self):
+        location, player = benchmark.build_location(livings=5, items=5, exits=12)
+        self.assertEqual(6, len(location.livings))
+        self.assertEqual(5, len(location.items))
+        self.assertTrue(any(" " in exit for exit in location.exits), "must have multi-word exits")
+        commands = benchmark.build_corpus(location)
+        for vtype in (verbs.VerbType.DEFA, verbs.VerbType.QUAD, verbs.VerbType.SIMP):
+            verb = min(verb for verb, data in verbs.VERBS.items() if data[0] == vtype)
+            self.assertIn(verb, commands)
+        result = benchmark.run(livings=5, items=5, exits=3, rounds=1)
+        self.assertEqual(len(commands), result.commands)
+        self.assertTrue(0 < result.errors < result.commands)
+        self.assertTrue(result.commands_per_second > 0)
+        self.assertTrue(result.percentile(50) <= result.percentile(99) <= result.percentile(100))
+        self.assertIn("commands/sec", result.report())
+
+    def testInstrumentation(self):
+        ticks = iter(range(1000))
+        timings = instrumentation.Instrumentation(clock=lambda: next(ticks))
+        soul = parse.Soul()
+        self.assertIsNone(soul.instrumentation)
+        soul.instrumentation = timings
+        player = Living("julie", "f")
+        player.move(Location("somewhere"))
+        Living("max", "m").move(player.location)
+        parsed = soul.parse(player, "smile at max")
+        soul.process_verb_parsed(player, parsed)
+        with self.assertRaises(parse.ParseError):
+            soul.parse(player, "smile at undefined")
+        stages = timings.stage_report()
+        for stage in ["tokenize", "verb", "scope", "names", "words", "template", "render"]:
+            self.assertIn(stage, stages)
+        self.assertEqual((4, 4), stages["names"], "each clock tick is one time unit, 2 words per command")
+        self.assertEqual(["smile"], timings.verbs("process"))
+        self.assertEqual([instrumentation.ERROR_VERB, "smile"], timings.verbs("parse"))
+        latency = timings.latencies["parse", "smile"][0]
+        self.assertEqual([0, 1, 0], timings.histogram("smile", buckets=[latency - 1, latency]))
+        self.assertEqual([0, 0, 1], timings.histogram("smile", buckets=[latency - 2, latency - 1]))
+        self.assertEqual([0], timings.histogram("unknown", buckets=[]))
+        self.assertIn("tokenize", timings.report())
+        timings.clear()
+        self.assertEqual({}, timings.stage_report())
+
+    def testVerbAbbreviations(self):
+        soul = parse.Soul()
+        self.assertFalse(soul.abbreviate_verbs)
+        player = Living("julie", "f")
+        player.move(Location("somewhere"))
+        bob = Living("bob", "m")
+        bob.move(player.location)
+        player.location.items.add(Item("gift"))
+        with self.assertRaises(parse.UnknownVerbError):
+            soul.parse(player, "tic bob")
+        soul = parse.Soul(abbreviate_verbs=True)
+        self.assertEqual(["tickle"], soul.expand_verb_abbreviation("tic"))
+        self.assertEqual(["nod"], soul.expand_verb_abbreviation("nod"), "full verb must not be ambiguous")
+        self.assertEqual(["grease", "greet"], soul.expand_verb_abbreviation("gr", amount=2))
+        self.assertEqual(["look", "loot"], soul.expand_verb_abbreviation("loo", {"loot", "look"}))
+        self.assertEqual([], soul.expand_verb_abbreviation("xyz", {"look"}))
+        parsed = soul.parse(player, "tic bob")
+        self.assertEqual("tickle", parsed.verb)
+        self.assertEqual([bob], list(parsed.who_info))
+        self.assertEqual("bob", parsed.unparsed)
+        parsed = soul.parse(player, "fail to gig")
+        self.assertEqual("fail", parsed.qualifier)
+        self.assertEqual("giggle", parsed.verb)
+        parsed = soul.parse(player, "loo at bob", external_verbs={"look"})
+        self.assertEqual("look", parsed.verb)
+        parsed = soul.parse(player, "whisp bob 'hello'")
+        self.assertEqual("whisper", parsed.verb)
+        self.assertEqual("hello", parsed.message)
+        with self.assertRaises(parse.AmbiguousVerbError) as x:
+            soul.parse(player, "gr at bob")
+        self.assertEqual("gr", x.exception.verb)
+        self.assertEqual(["grease", "greet", "grimace", "grin", "gripe"], x.exception.suggestions)
+        self.assertIsInstance(x.exception, parse.UnknownVerbError, "engine must still be able to search other verbs")
+        # names of things that are here are not abbreviations
+        parsed = soul.parse(player, "gift")
+        self.assertEqual("examine", parsed.verb)
+        self.assertEqual("gi", soul.expand_verb_abbreviation("gi")[0][:2])
+        # words the parser understands by themselves are not abbreviations either
+        parsed = soul.parse(player, "me")
+        self.assertEqual("examine", parsed.verb)
+        self.assertEqual([player], list(parsed.who_info))
+        for bodypart in ("hand", "head"):
+            with self.assertRaises(parse.UnknownVerbError) as x:
+                soul.parse(player, bodypart)
+            self.assertNotIsInstance(x.exception, parse.AmbiguousVerbError)
+            self.assertEqual(bodypart, x.exception.verb)
+
+    def testVerbMessage(self):
+        soul = parse.Soul()
+        player = Living("julie", "f")
+        max_ = Living("max", "m")
+        kate = Living("kate", "f", title="Kate")
+        parsed = parse.ParseResult("smile", who_list=[max_, kate])
+        who, player_msg, room_msg, target_msg = soul.process_verb_parsed(player, parsed)
+        message = soul.verb_message(player, parsed)
+        self.assertEqual(player_msg, message.actor_message)
+        self.assertEqual("You smile happily at max and Kate.", message.render(player))
+        self.assertEqual(room_msg, message.room_message)
+        self.assertEqual("Julie smiles happily at max and Kate.", message.render(Living("bob", "m")))
+        self.assertEqual("Julie smiles happily at max and Kate.", message.render(None))
+        self.assertEqual(target_msg, message.target_message)
+        self.assertEqual("Julie smiles happily at you.", message.target_message)
+        self.assertEqual("Julie smiles happily at you and Kate.", message.render(max_))
+        self.assertEqual("Julie smiles happily at max and you.", message.render(kate))
+        self.assertIs(message.render(kate), message.render(kate))
+        message = soul.verb_message(player, parse.ParseResult("ruffle", who_list=[max_]))
+        self.assertEqual("You ruffle max's hair.", message.render(player))
+        self.assertEqual("Julie ruffles your hair.", message.render(max_))
+        self.assertEqual("Julie ruffles max's hair.", message.render(kate))
+        with self.assertRaises(parse.ParseError):
+            soul.verb_message(player, parse.ParseResult("slap"))
+
+    def testPronounHistory(self):
+        soul = parse.Soul(pronoun_history=3)
+        room = Location("somewhere")
+        julie = Living("julie", "f")
+        fritz = Living("fritz", "m")
+        kate = Living("kate", "f")
+        max_ = Living("max", "m")
+        for living in (julie, fritz, kate, max_):
+            living.move(room)
+        newspaper = Item("newspaper")
+        room.items.add(newspaper)
+        # every player has their own history, of the last 3 commands
+        soul.remember_previous_parse(soul.parse(julie, "hug kate"), julie)
+        soul.remember_previous_parse(soul.parse(fritz, "hug max"), fritz)
+        soul.remember_previous_parse(soul.parse(julie, "poke newspaper"), julie)
+        self.assertEqual(kate, soul.parse(julie, "kiss her").who_1)
+        self.assertEqual(newspaper, soul.parse(julie, "kick it").who_1)
+        self.assertEqual([newspaper], list(soul.parse(julie, "kick them").who_info))
+        self.assertEqual(max_, soul.parse(fritz, "kiss him").who_1)
+        with self.assertRaises(parse.ParseError):
+            soul.parse(fritz, "kiss her")
+        soul.remember_previous_parse(soul.parse(julie, "nod"), julie)
+        soul.remember_previous_parse(soul.parse(julie, "grin"), julie)
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(julie, "kiss her")
+        self.assertEqual("It is not clear who or what you're referring to.", str(x.exception))
+        # objects that move away are no longer around, until they come back
+        soul.remember_previous_parse(soul.parse(julie, "hug kate"), julie)
+        kate.move(Location("elsewhere"))
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(julie, "kiss her")
+        self.assertEqual("She is no longer around.", str(x.exception))
+        kate.move(room)
+        self.assertEqual(kate, soul.parse(julie, "kiss her").who_1)
+        # the history doesn't keep the objects alive
+        soul.remember_previous_parse(soul.parse(julie, "poke newspaper"), julie)
+        room.items.clear()
+        del newspaper
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(julie, "kick it")
+        self.assertEqual("It is no longer around.", str(x.exception))
+        self.assertEqual(kate, soul.parse(julie, "kiss her").who_1)
+
+    def testCompiledTables(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "soul_tables.bin")
+            self.assertFalse(tables.load(path), "no compiled tables yet")
+            tables.build(path)
+            compiled = tables.read(path)
+            template = compiled["templates"]["smile", True, False]
+            self.assertEqual(templates.get("smile", True, False).room, template.room)
+            self.assertEqual(templates.get("smile", True, False).slots, template.slots)
+            self.assertEqual(["happily", "hazily"], compiled["adverb_spell_index"].suggest("hapily"))
+            self.assertEqual(["tickle"], compiled["verb_prefix_index"].search("tick"))
+            self.assertTrue(tables.load(path))
+            self.assertEqual(["tickle"], parse.Soul().expand_verb_abbreviation("tick"))
+            self.assertFalse(tables.load(""))
+            with open(path, "r+b") as file:
+                file.seek(len(tables.MAGIC))
+                file.write(b"0" * 40)   # a different fingerprint
+            self.assertIsNone(tables.read(path), "outdated tables must not be used")
+            with open(path, "wb") as file:
+                file.write(tables.MAGIC + tables.fingerprint() + b"garbage")
+            self.assertIsNone(tables.read(path), "corrupt tables must not be used")
+
+    def testTablesLoadedLazily(self):
+        code = "import sys, tale_ng.soul.verbs, tale_ng.soul.parse as parse; " \
+               "print(sorted(m for m in ('argparse', 'threading', 'tale_ng.sharedtable', 'tale_ng.soul.tables') if m in sys.modules)); " \
+               "parse.Soul(); print('tale_ng.soul.tables' in sys.modules)"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+        self.assertEqual(["[]", "True"], output.split())
+
+    def testSharedTables(self):
+        saved = (verbs.VERBS, adverbs.ADVERBS, adverbs.ALPHABETICALLY, adverbs._prefix_index, adverbs._spell_index,
+                 parse.Soul._verb_prefix_index, parse.Soul._verb_spell_index)
+        player = Living("julie", "f")
+        commands = ["smile", "tickle julie on the arm", "smile hapily", "smile hap", "tikcle", "fail to grin 'hello'"]
+
+        def results():
+            soul = parse.Soul(abbreviate_verbs=True)
+            outcome = []
+            for command in commands:
+                try:
+                    outcome.append(soul.process_verb(player, command)[1][1:])
+                except parse.ParseError as x:
+                    outcome.append(str(x))
+            return outcome
+        expected = results()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "soul_tables.shared")
+                tables.share(path)
+                self.assertTrue(os.path.exists(path))
+                self.assertEqual(len(saved[0]), len(verbs.VERBS))
+                self.assertEqual(verbs.VerbType.DEFA, verbs.VERBS["smile"][0])
+                self.assertIn("happily", adverbs.ADVERBS)
+                self.assertEqual(saved[2], list(adverbs.ALPHABETICALLY))
+                self.assertEqual(expected, results())
+                tables.share(path)   # now it uses the existing file
+                self.assertEqual(expected, results())
+        finally:
+            verbs.VERBS, adverbs.ADVERBS, adverbs.ALPHABETICALLY, adverbs._prefix_index, adverbs._spell_index, \
+                parse.Soul._verb_prefix_index, parse.Soul._verb_spell_index = saved
+
+    def testVerbRegistry(self):
+        game = registry.VerbRegistry()
+        self.assertEqual(registry.SOUL, game.lookup("smile"))
+        self.assertIsNone(game.lookup("look"))
+        self.assertEqual(frozenset(), game.external_verbs())
+        game.register("driver", {"look", "take", "say"}, priority=10)
+        self.assertEqual("driver", game.lookup("look"))
+        self.assertTrue(game.is_external("say"))
+        self.assertFalse(game.is_external("smile"))
+        zone = registry.VerbRegistry(game)
+        zone.register("castle", {"smile", "pull", "look"}, priority=5)
+        self.assertEqual("castle", zone.lookup("smile"), "zone verbs have priority over soul verbs")
+        self.assertEqual("driver", zone.lookup("look"), "driver commands have priority over zone verbs")
+        self.assertEqual(registry.SOUL, game.lookup("smile"), "the parent is not affected")
+        version = zone.version
+        game.register("driver", {"look", "take", "say", "quit"}, priority=10)
+        self.assertGreater(zone.version, version, "changes to the parent change the version")
+        self.assertEqual("driver", zone.lookup("quit"))
+        zone.unregister("castle")
+        self.assertEqual(registry.SOUL, zone.lookup("smile"))
+        self.assertEqual({"look", "take", "say", "quit"}, zone.external_verbs())
+        # parsing with a registry
+        soul = parse.Soul(parse_cache_size=10, verb_registry=game)
+        player = Living("julie", "f")
+        with self.assertRaises(parse.NonSoulVerbError) as x:
+            soul.process_verb(player, "take the key")
+        self.assertEqual("take", x.exception.parsed.verb)
+        self.assertEqual("smile", soul.process_verb(player, "smile")[0])
+        zone.register("castle", {"smile"}, priority=5)
+        with self.assertRaises(parse.NonSoulVerbError):
+            soul.process_verb(player, "smile", zone)
+        self.assertEqual(["xyzzy"], soul.parse(player, "smile xyzzy", zone).unrecognized)
+        zone.unregister("castle")
+        with self.assertRaises(parse.ParseError, msg="the cached result of the zone verb must not be used"):
+            soul.parse(player, "smile xyzzy", zone)
+        self.assertEqual(["quit"], soul.suggest_verbs("qiut"))
+        self.assertEqual(["salute", "say"], soul.expand_verb_abbreviation("sa"))
+        # a set of external verbs gets a registry on top of the soul's, the same set gets the same registry
+        external = {"xyzzy"}
+        xyzzy = soul.registry_for(external)
+        self.assertEqual("external", xyzzy.lookup("xyzzy"))
+        self.assertIs(xyzzy, soul.registry_for(external))
+        self.assertIs(xyzzy, soul.registry_for({"xyzzy"}))
+        external.add("plugh")
+        self.assertEqual("external", soul.registry_for(external).lookup("plugh"), "a changed set must get another registry")
+        external.discard("xyzzy")
+        self.assertIsNone(soul.registry_for(external).lookup("xyzzy"), "also if it still has the same size")
+        frozen = frozenset({"plugh"})
+        self.assertIs(soul.registry_for(frozen), soul.registry_for(frozen))
+
+    def testReloadTables(self):
+        original = tables.prepare_reload()
+        self.assertEqual(dict(verbs.VERBS), original["VERBS"])
+        self.assertEqual(set(adverbs.ADVERBS), original["ADVERBS"])
+        self.assertIs(verbs.VerbType.DEFA, original["VERBS"]["smile"][0])
+        soul = parse.Soul(parse_cache_size=10)
+        player = Living("julie", "f")
+        version = soul.verb_registry.version
+        old_verbs = verbs.VERBS
+        prepared = tables.prepare_reload()
+        prepared["VERBS"]["frobnicate"] = (verbs.VerbType.DEFA, ("wildly", ), "", "at")
+        prepared["ADVERBS"].add("frobbingly")
+        prepared.update(tables.compile_tables(prepared["VERBS"], prepared["ADVERBS"]))
+        try:
+            tables.swap(prepared)
+            self.assertIsNot(old_verbs, verbs.VERBS)
+            self.assertNotIn("frobnicate", old_verbs, "the old tables must not be modified")
+            self.assertGreater(soul.verb_registry.version, version)
+            self.assertEqual("frobnicate", soul.parse(player, "frobnicate frobbingly").verb)
+            self.assertEqual(("You frobnicate wildly.", "Julie frobnicates wildly."), soul.process_verb(player, "frobnicate")[1][1:3])
+            self.assertEqual(["frobnicate"], soul.suggest_verbs("frobnicte"))
+            self.assertEqual(["frobbingly"], adverbs.search_prefix("frobb"))
+            self.assertEqual("frobbingly", soul.parse(player, "smile frobb").adverb, "the parser must use the new adverb index")
+            errors = []
+            thread = tables.reload(background=True, done=errors.append)
+            thread.join()
+            self.assertEqual([None], errors)
+            self.assertNotIn("frobnicate", verbs.VERBS)
+            with self.assertRaises(parse.UnknownVerbError):
+                soul.parse(player, "frobnicate")
+        finally:
+            tables.swap(original)
+        module = types.ModuleType("notsource")
+        module.__file__ = "notsource.txt"
+        with self.assertRaises(TaleError):
+            tables._load_source(module)
+
+    def testParseErrorCodes(self):
+        soul = parse.Soul()
+        player = Living("julie", "f")
+        player.move(Location("somewhere"))
+        player.location.livings = {Living("max", "m"), player}
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(player, "smile at max happily sadly")
+        self.assertEqual(parse.ErrorCode.BOTH_ADVERBS, x.exception.code)
+        self.assertEqual("sadly", x.exception.word)
+        self.assertEqual("happily", x.exception.other)
+        self.assertEqual(21, x.exception.position)
+        self.assertEqual("You can't do that both happily and sadly.", str(x.exception))
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(player, "smile Xyzzy")
+        self.assertEqual(parse.ErrorCode.UNCLEAR_WORD, x.exception.code)
+        self.assertEqual(6, x.exception.position)
+        self.assertEqual("It's not clear what you mean by 'Xyzzy'. Just type in lowercase ('xyzzy').", x.exception.message)
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(player, "smile at m")
+        self.assertEqual(parse.ErrorCode.NAME_PREFIX, x.exception.code)
+        self.assertEqual(["max"], list(x.exception.candidates))
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(player, "smile him")
+        self.assertEqual(parse.ErrorCode.UNCLEAR_PRONOUN, x.exception.code)
+        self.assertEqual(6, x.exception.position)
+        with self.assertRaises(parse.UnknownVerbError) as x:
+            soul.parse(player, "smiel")
+        self.assertEqual(parse.ErrorCode.UNKNOWN_VERB, x.exception.code)
+        self.assertIsNone(x.exception._suggestions, "suggestions must only be searched for when they're asked for")
+        self.assertIn("smile", x.exception.candidates)
+        self.assertIs(x.exception.candidates, x.exception.suggestions)
+        self.assertEqual("smiel", str(x.exception))
+        error = parse.ParseError("Something else.")
+        self.assertEqual(parse.ErrorCode.MESSAGE, error.code)
+        self.assertEqual("Something else.", str(error))
+        error = parse.ParseError(parse.ErrorCode.MOVE_WHERE, "crawl")
+        self.assertIsNone(error._message, "message must not be rendered before it is needed")
+        self.assertEqual("Crawl where?", str(error))
+        error = parse.ParseError(parse.ErrorCode.MOVE_WHERE, "walk")
+        self.assertEqual(("Walk where?",), error.args, "the args must be the message, like other exceptions")
+        self.assertEqual(("Something else.",), parse.ParseError("Something else.").args)
+
     def testParseMovement(self):
         # check movement parsing for room exits
         soul = parse.Soul()
@@ -692,6 +1227,30 @@ class TestSoulNG(unittest.TestCase):
         self.assertEqual("hastily red or blue", parsed.unparsed)
         parsed = soul.parse(player, "fail say hastily red or blue on your head", external_verbs={"say"})
         self.assertEqual("hastily red or blue on your head", parsed.unparsed)
+        parsed = soul.parse(player, "  fail say  'red or blue'  ", external_verbs={"say"})
+        self.assertEqual("'red or blue'  ", parsed.unparsed)
+
+    def testMessageTokens(self):
+        soul = parse.Soul()
+        player = Living("julie", "f")
+        player.move(Location("somewhere"))
+        max_npc = Living("max", "m")
+        max_npc.move(player.location)
+        kate_npc = Living("kate", "f")
+        kate_npc.move(player.location)
+        parsed = soul.parse(player, "don't say 'don't do that' to max")
+        self.assertEqual("don't", parsed.qualifier)
+        self.assertEqual("say", parsed.verb)
+        self.assertEqual("don't do that", parsed.message)
+        self.assertEqual([max_npc], list(parsed.who_info))
+        parsed = soul.parse(player, "say 'hi' to max 'and bye'")
+        self.assertEqual("hi' to max 'and bye", parsed.message, "message goes from first to last quote")
+        self.assertEqual([], list(parsed.who_info))
+        parsed = soul.parse(player, "smile max , kate")
+        self.assertEqual([max_npc, kate_npc], list(parsed.who_info))
+        with self.assertRaises(parse.ParseError) as x:
+            soul.parse(player, "'hello'")
+        self.assertEqual("What?", str(x.exception))
 
     def testDEFA(self):
         soul = parse.Soul()
@@ -882,6 +1441,31 @@ class TestSoulNG(unittest.TestCase):
     def testFULL(self):
         pass  # FULL is not yet used
 
+    def testCompiledTemplates(self):
+        template = templates.get("smile", False, False)
+        self.assertIs(template, templates.get("smile", False, False), "templates must be compiled only once")
+        self.assertEqual("smile%(how)s", template.player, "slot values include their leading space")
+        self.assertEqual("smiles%(how)s", template.room)
+        self.assertFalse(template.needs_person)
+        template = templates.get("smile", True, False)
+        self.assertEqual("smile%(how)s at%(who)s", template.player)
+        self.assertEqual({"how", "who"}, template.slots)
+        self.assertTrue(templates.get("touch", False, False).needs_person)
+        self.assertFalse(templates.get("touch", True, False).needs_person)
+        self.assertEqual("hold%(who)s%(how)s in%(your)s arms", templates.get("hold", True, False).player)
+        self.assertEqual("hold%(who)s%(how)s%(where)s", templates.get("hold", True, True).player)
+        for verb in verbs.VERBS:
+            for with_targets in (False, True):
+                templates.get(verb, with_targets, False)
+                templates.get(verb, with_targets, True)
+        # message text is inserted literally
+        soul = parse.Soul()
+        player = Living("julie", "f")
+        parsed = parse.ParseResult("say", message="that costs 5$ or 10%")
+        who, player_msg, room_msg, target_msg = soul.process_verb_parsed(player, parsed)
+        self.assertEqual("You say: that costs 5$ or 10%.", player_msg)
+        self.assertEqual("Julie says: that costs 5$ or 10%.", room_msg)
+
     def testPronounReferences(self):
         soul = parse.Soul()
         player = Living("julie", "f")
@@ -0,0 +1,46 @@
+"""
+Unit tests for the prefix and spelling indexes
+
+'Tale-NG' mud driver, mudlib and interactive fiction framework
+Copyright by Irmen de Jong (irmen@razorvine.net)
+"""
+
+from tale_ng.textindex import PrefixIndex, SpellIndex, edit_distance
+
+
+def test_prefixindex():
+    index = PrefixIndex(["bob", "bobby", "alice", "bert", "bob"])
+    assert len(index) == 4
+    assert index.search("b") == ["bert", "bob", "bobby"]
+    assert index.search("bo") == ["bob", "bobby"]
+    assert index.search("bob") == ["bob", "bobby"]
+    assert index.search("b", 1) == ["bert"]
+    assert index.search("bobbyz") == []
+    assert index.search("c") == []
+    assert index.search("") == ["alice", "bert", "bob", "bobby"]
+    assert index.count("bo") == 2
+    assert index.count("x") == 0
+
+
+def test_spellindex():
+    index = SpellIndex(["quickly", "quietly", "slowly", "happily", "hazily"])
+    assert index.suggest("quikly") == ["quickly"]
+    assert index.suggest("qiuckly") == ["quickly"], "transposition"
+    assert index.suggest("quicklyy") == ["quickly"]
+    assert index.suggest("qucikly") == ["quickly"]
+    assert index.suggest("hapily") == ["happily", "hazily"]
+    assert index.suggest("hapily", 1) == ["happily"]
+    assert index.suggest("quickly") == []
+    assert index.suggest("slo") == []
+    index2 = SpellIndex(["quickly", "slowly"], max_distance=2)
+    assert index2.suggest("qikly") == ["quickly"]
+    assert index2.suggest("sl") == []
+
+
+def test_edit_distance():
+    assert edit_distance("", "") == 0
+    assert edit_distance("abc", "") == 3
+    assert edit_distance("ab", "ba") == 1
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("kitten", "sitting", 1) == 2
+    assert edit_distance("a", "abcdef", 2) == 3